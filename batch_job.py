@@ -0,0 +1,365 @@
+"""
+批量作业文件：以声明式 JSON/YAML 描述多个 PDF 中的多个选区及其导出选项，并批量执行。
+
+作业文件示例（JSON）：
+  {
+    "output": "out",                       # 输出目录（相对作业文件所在目录）
+    "svg_assets": false,                   # true 时各 SVG 的内嵌图片与字形写为输出目录中的共享文件
+    "atlas": false,                        # 或 {"name": "atlas", "formats": ["PNG", "WEBP"], "max_size": 2048}：
+                                           # 所有条目的尺寸阶梯合并为图集（附 JSON/CSS 坐标表），不再单独写位图
+    "defaults": {                          # 各选区的缺省选项，可在选区中单独覆盖
+      "sizes": [64, 128, 256],
+      "formats": ["SVG", "PNG"],           # SVG / PNG / WEBP / JPG / ICO
+      "remove_bg": false,
+      "dpi": 0                             # > 0 时额外按该 DPI 条带渲染一份完整 PNG
+    },
+    "documents": [
+      {
+        "path": "catalog.pdf",             # 相对作业文件所在目录
+        "regions": [
+          {"page": 1, "rect": [10, 20, 110, 120], "name": "logo"},
+          {"page": 3}                      # 省略 rect 表示整页
+        ]
+      }
+    ]
+  }
+
+rect 为页面坐标（72dpi 基础，与界面选区换算到页面后的坐标一致）。YAML 需要安装 PyYAML。
+
+执行时对相同的（文档, 页, 选区, 去白底）只渲染一次：所有引用它的条目合并尺寸与格式后统一渲染，
+再分发给各条目；渲染任务按文档分组、按工作量从大到小调度到进程池。
+
+用法：
+  python batch_job.py job.json [--workers 4]
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+import export_engine
+
+
+DEFAULT_OPTIONS = {
+    "sizes": [64, 128, 256],
+    "formats": ["SVG", "PNG"],
+    "remove_bg": False,
+    "dpi": 0,
+}
+IMAGE_FORMATS = ("PNG", "WEBP", "JPG", "ICO")
+FORMAT_EXT = {"PNG": "png", "WEBP": "webp", "JPG": "jpg", "ICO": "ico"}
+# 单个进程池任务最多处理的唯一渲染数；大文档拆分后可并行
+CHUNK_SIZE = 16
+
+
+def _is_yaml(path) -> bool:
+    return Path(path).suffix.lower() in (".yaml", ".yml")
+
+
+def _yaml():
+    try:
+        import yaml
+    except Exception:
+        raise RuntimeError("读写 YAML 作业文件需要安装 PyYAML：pip install pyyaml")
+    return yaml
+
+
+def load_job(path) -> dict:
+    text = Path(path).read_text(encoding="utf-8")
+    job = _yaml().safe_load(text) if _is_yaml(path) else json.loads(text)
+    job = job or {}
+    job.setdefault("documents", [])
+    return job
+
+
+def save_job(path, job: dict):
+    if _is_yaml(path):
+        text = _yaml().safe_dump(job, allow_unicode=True, sort_keys=False)
+    else:
+        text = json.dumps(job, ensure_ascii=False, indent=2)
+    Path(path).write_text(text, encoding="utf-8")
+
+
+def add_region(job: dict, pdf_path: str, page: int, rect, options: dict = None, name: str = None) -> dict:
+    """
+    向作业中追加一个选区（page 从 1 开始）；同一 PDF 的选区归入同一文档条目。
+    """
+    doc_entry = None
+    for d in job["documents"]:
+        if d.get("path") == pdf_path:
+            doc_entry = d
+            break
+    if doc_entry is None:
+        doc_entry = {"path": pdf_path, "regions": []}
+        job["documents"].append(doc_entry)
+    region = {"page": int(page), "rect": [round(float(v), 3) for v in rect]}
+    if name:
+        region["name"] = name
+    region.update(options or {})
+    doc_entry["regions"].append(region)
+    return region
+
+
+def _render_key(path: str, page: int, rect, remove_bg: bool) -> str:
+    raw = json.dumps([path, page, [round(v, 3) for v in rect] if rect else None, remove_bg])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _atlas_options(job: dict):
+    """
+    解析作业顶层的 atlas 选项：false/缺省返回 None，true 使用缺省值。
+    """
+    atlas = job.get("atlas")
+    if not atlas:
+        return None
+    opts = {"name": "atlas", "formats": ["PNG"], "max_size": 2048, "padding": 1}
+    if isinstance(atlas, dict):
+        opts.update(atlas)
+    opts["formats"] = [str(f).upper() for f in opts["formats"]]
+    return opts
+
+
+def plan_job(job: dict, base_dir) -> tuple:
+    """
+    展开作业为输出条目，并按（文档, 页, 选区, 去白底）合并为唯一渲染。
+    返回 (entries, renders)：
+    - entries：每个选区条目的输出需求（名称、尺寸、格式、对应渲染键）；
+    - renders：渲染键 -> 合并后的渲染需求（所有引用条目的尺寸、格式、DPI 的并集）。
+    条目名称决定输出文件名（及图集帧名），名称重复时抛出 ValueError。
+    """
+    base_dir = Path(base_dir)
+    defaults = dict(DEFAULT_OPTIONS)
+    defaults.update(job.get("defaults") or {})
+    atlas = _atlas_options(job) is not None
+    entries = []
+    renders = {}
+    names = {}
+    for d in job["documents"]:
+        path = str((base_dir / d["path"]).resolve())
+        stem = Path(path).stem
+        for k, region in enumerate(d.get("regions") or [], 1):
+            opts = dict(defaults)
+            opts.update(region)
+            page = int(opts.get("page", 1))
+            rect = opts.get("rect")
+            rect = [float(v) for v in rect] if rect else None
+            remove_bg = bool(opts["remove_bg"])
+            formats = [str(f).upper() for f in opts["formats"]]
+            sizes = sorted({int(s) for s in opts["sizes"] if int(s) > 0})
+            dpi = int(opts.get("dpi") or 0)
+            key = _render_key(path, page, rect, remove_bg)
+            name = opts.get("name") or f"{stem}_p{page}_r{k}"
+            if name in names:
+                raise ValueError(f"条目名称重复: {name}（{names[name]} 与 {d['path']} 第 {k} 个选区）")
+            names[name] = f"{d['path']} 第 {k} 个选区"
+            entries.append({
+                "name": name,
+                "key": key,
+                "formats": formats,
+                "sizes": sizes,
+                "dpi": dpi,
+            })
+            r = renders.setdefault(key, {
+                "path": path, "page": page, "rect": rect, "remove_bg": remove_bg,
+                "svg": False, "sizes": set(), "formats": set(), "dpis": set(),
+            })
+            r["svg"] = r["svg"] or "SVG" in formats
+            image_formats = [f for f in formats if f in IMAGE_FORMATS]
+            if image_formats and sizes:
+                r["sizes"].update(sizes)
+                # 图集模式下只需 PNG 作为装箱素材
+                r["formats"].update(["PNG"] if atlas else image_formats)
+            if dpi > 0:
+                r["dpis"].add(dpi)
+    return entries, renders
+
+
+def _raise_ladder_error(target, exc):
+    # 任一尺寸失败即记为该渲染失败，避免缺失的文件在分发时被当作“未生成”静默跳过
+    raise RuntimeError(f"尺寸 {target} 导出失败: {type(exc).__name__}: {exc}") from exc
+
+
+def _run_renders(path: str, items: list, cache_dir: str, asset_dir: str = None) -> dict:
+    """
+    进程池任务：在同一进程内打开文档一次，完成若干唯一渲染，
+    结果写入 cache_dir/<渲染键>/。返回 渲染键 -> (错误信息或 None, 选区原始尺寸)。
+    asset_dir 不为空时 SVG 的共享图片与字形直接写入该目录（按内容命名，进程间可安全共用）。
+    """
+    cairosvg = None
+    if any(r["sizes"] for _, r in items):
+        cairosvg = export_engine.load_cairosvg()
+    assets = export_engine.SvgAssetStore(asset_dir) if asset_dir else None
+    results = {}
+    doc = fitz.open(path)
+    try:
+        for key, r in items:
+            out = Path(cache_dir) / key
+            out.mkdir(parents=True, exist_ok=True)
+            try:
+                pno = r["page"] - 1
+                if not 0 <= pno < doc.page_count:
+                    raise ValueError(f"页码超出范围: {r['page']}")
+                page = doc[pno]
+                rect = fitz.Rect(r["rect"]) & page.rect if r["rect"] else page.rect
+                if rect.is_empty:
+                    raise ValueError("选区为空")
+                if r["svg"]:
+                    export_engine.write_svg(doc, pno, rect, out / "r.svg", remove_bg=r["remove_bg"], assets=assets)
+                if r["sizes"]:
+                    export_engine.export_size_ladder(
+                        doc, pno, rect, sorted(r["sizes"]), sorted(r["formats"]), out,
+                        base="r", remove_bg=r["remove_bg"], cairosvg=cairosvg,
+                        on_error=_raise_ladder_error,
+                    )
+                for dpi in sorted(r["dpis"]):
+                    export_engine.render_png_strips(page, rect, dpi, out / f"r_{dpi}dpi.png", remove_bg=r["remove_bg"])
+                results[key] = (None, (int(rect.width), int(rect.height)))
+            except Exception as e:
+                results[key] = (f"{type(e).__name__}: {e}", None)
+    finally:
+        doc.close()
+        if assets is not None:
+            assets.close()
+    return results
+
+
+def _schedule(renders: dict):
+    """
+    按文档分组并切分为不超过 CHUNK_SIZE 的任务，按工作量从大到小排列（大任务先行，均衡负载）。
+    """
+    by_doc = {}
+    for key, r in renders.items():
+        by_doc.setdefault(r["path"], []).append((key, r))
+    chunks = []
+    for path, items in by_doc.items():
+        items.sort(key=lambda kr: (kr[1]["page"], kr[0]))
+        for i in range(0, len(items), CHUNK_SIZE):
+            chunk = items[i:i + CHUNK_SIZE]
+            cost = sum(1 + len(r["sizes"]) + 4 * len(r["dpis"]) for _, r in chunk)
+            chunks.append((cost, path, chunk))
+    chunks.sort(key=lambda c: -c[0])
+    return chunks
+
+
+def run_job(job_path, workers: int = 0, log=print) -> dict:
+    """
+    执行作业文件，返回统计信息 {"entries", "renders", "files", "errors"}。
+    """
+    job_path = Path(job_path)
+    job = load_job(job_path)
+    base_dir = job_path.parent
+    out_dir = base_dir / (job.get("output") or "output")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    entries, renders = plan_job(job, base_dir)
+    log(f"条目 {len(entries)} 个，去重后唯一渲染 {len(renders)} 个")
+
+    errors = {}
+    orig_sizes = {}
+    asset_dir = str(out_dir) if job.get("svg_assets") else None
+    cache = tempfile.mkdtemp(prefix=".job_", dir=out_dir)
+    try:
+        chunks = _schedule(renders)
+        with ProcessPoolExecutor(max_workers=workers or None) as pool:
+            futures = {pool.submit(_run_renders, path, chunk, cache, asset_dir): chunk for _, path, chunk in chunks}
+            for fut in as_completed(futures):
+                try:
+                    res = fut.result()
+                except Exception as e:
+                    # 整个任务失败（如文档无法打开）：该任务中的渲染全部记为失败
+                    res = {key: (f"{type(e).__name__}: {e}", None) for key, _ in futures[fut]}
+                for key, (err, size) in res.items():
+                    orig_sizes[key] = size
+                    if err:
+                        errors[key] = err
+                        log(f"渲染失败 {Path(renders[key]['path']).name} 第 {renders[key]['page']} 页: {err}")
+
+        # 分发：把共享的渲染结果复制为各条目所需的输出文件（ICO 超过 256 时按设计不生成，跳过）
+        atlas_opts = _atlas_options(job)
+        atlas = None
+        if atlas_opts:
+            atlas = export_engine.AtlasBuilder(
+                out_dir, name=atlas_opts["name"], formats=atlas_opts["formats"],
+                max_size=int(atlas_opts["max_size"]), padding=int(atlas_opts["padding"]),
+            )
+        files = 0
+        for entry in entries:
+            if entry["key"] in errors:
+                continue
+            src_dir = Path(cache) / entry["key"]
+            for src_name, dst_name in _wanted_files(entry, orig_sizes[entry["key"]], src_dir, raster=atlas is None):
+                if (src_dir / src_name).exists():
+                    shutil.copyfile(src_dir / src_name, out_dir / dst_name)
+                    files += 1
+            if atlas is not None:
+                for src_name, frame in _atlas_frames(entry, orig_sizes[entry["key"]]):
+                    if (src_dir / src_name).exists():
+                        with Image.open(src_dir / src_name) as img:
+                            atlas.add(frame, img.convert("RGBA"))
+        if atlas is not None:
+            files += len(atlas.close(log=log))
+    finally:
+        shutil.rmtree(cache, ignore_errors=True)
+    log(f"完成，导出文件 {files} 个，失败渲染 {len(errors)} 个")
+    return {"entries": len(entries), "renders": len(renders), "files": files, "errors": errors}
+
+
+def _wanted_files(entry: dict, orig_size, src_dir: Path, raster: bool = True):
+    """
+    返回条目所需的 (缓存文件名, 输出文件名) 列表：SVG（及其引用的图片）、本条目尺寸阶梯中的各格式、原始尺寸 PNG 与 DPI PNG。
+    raster 为 False（图集模式）时不含尺寸阶梯与原始尺寸位图。
+    """
+    name = entry["name"]
+    wanted = []
+    if "SVG" in entry["formats"]:
+        wanted.append(("r.svg", f"{name}.svg"))
+        # 纯图片选区的 SVG 引用的外部图片，按内容命名，各条目共用同一文件
+        wanted.extend((p.name, p.name) for p in sorted(src_dir.glob("img_*")))
+    exts = [FORMAT_EXT[f] for f in entry["formats"] if f in IMAGE_FORMATS]
+    if raster and exts and entry["sizes"]:
+        orig_w, orig_h = orig_size
+        for target in entry["sizes"]:
+            w, h = export_engine.ladder_size(target, orig_w, orig_h)
+            for ext in exts:
+                wanted.append((f"r_{w}x{h}.{ext}", f"{name}_{w}x{h}.{ext}"))
+        wanted.append((f"r_{orig_w}x{orig_h}.png", f"{name}_{orig_w}x{orig_h}.png"))
+    if entry["dpi"] > 0:
+        wanted.append((f"r_{entry['dpi']}dpi.png", f"{name}_{entry['dpi']}dpi.png"))
+    return wanted
+
+
+def _atlas_frames(entry: dict, orig_size):
+    """
+    返回条目在图集中的 (缓存 PNG 文件名, 帧名) 列表。
+    """
+    if not entry["sizes"] or not any(f in IMAGE_FORMATS for f in entry["formats"]):
+        return []
+    frames = []
+    for target in entry["sizes"]:
+        w, h = export_engine.ladder_size(target, *orig_size)
+        frames.append((f"r_{w}x{h}.png", f"{entry['name']}_{w}x{h}"))
+    return frames
+
+
+def main():
+    ap = argparse.ArgumentParser(description="执行批量作业文件（JSON/YAML）")
+    ap.add_argument("job", help="作业文件路径")
+    ap.add_argument("--workers", type=int, default=0, help="工作进程数（默认 CPU 核数）")
+    args = ap.parse_args()
+    try:
+        stats = run_job(args.job, workers=args.workers)
+    except ValueError as e:
+        raise SystemExit(f"作业文件无效: {e}")
+    raise SystemExit(1 if stats["errors"] else 0)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
@@ -0,0 +1,1314 @@
+"""
+与界面无关的导出引擎。
+
+目前提供：
+- 裁剪 SVG、白底去除（位图与 SVG）
+- 批量尺寸阶梯导出（CairoSVG 可选，缺省回退到 PyMuPDF）
+- 页面图形区域自动识别
+- 页面指纹与增量导出清单：文档改版后只重新导出内容有变化的页面
+- 图集（精灵图）输出：把尺寸阶梯或多个选区装箱为少量图集页，附 JSON/CSS 坐标表
+- 批量 SVG 的共享资源目录：重复的内嵌图片与字形定义只写一份，各 SVG 按文件名引用
+- 扫描页等纯图片选区的快速路径：直接裁剪嵌入图片的原生数据，SVG 以外部文件引用图片
+- 分条带（strip）栅格化 + 流式 PNG/TIFF 写出：超高 DPI / 超大选区时，
+  峰值内存由内存预算决定，而与整幅图像的总像素数无关。
+"""
+
+import base64
+import hashlib
+import io
+import json
+import math
+import os
+import re
+import struct
+import zlib
+from pathlib import Path
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+
+# 默认内存预算（字节）：单个条带像素缓冲的上限
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+# 条带上下额外渲染的重叠行数，使跨越条带边界的内容在裁掉重叠后衔接平滑。
+# 文字与填充与一次性整图渲染逐像素一致；描边的抗锯齿受 clip 影响，个别像素可能有细微差异
+STRIP_OVERLAP = 8
+# 去白底时每个条带在像素缓冲之外还会产生的整带副本数（RGBA 图像、通道拆分与掩码、结果及其字节串），
+# 条带行数按此缩小，使峰值仍受内存预算约束
+REMOVE_BG_COPIES = 6
+# 流式 PNG 每个 IDAT 块累积的压缩数据量
+IDAT_CHUNK_SIZE = 256 * 1024
+
+
+def remove_white_background(img: Image.Image, threshold: int = 250) -> Image.Image:
+    """
+    将近白像素（R、G、B 都 >= threshold）透明化，并与原 Alpha 叠乘。
+    """
+    from PIL import ImageChops, ImageOps
+    img = img.convert("RGBA")
+    r, g, b, a = img.split()
+    mask_r = r.point(lambda v: 255 if v >= threshold else 0)
+    mask_g = g.point(lambda v: 255 if v >= threshold else 0)
+    mask_b = b.point(lambda v: 255 if v >= threshold else 0)
+    white_mask = ImageChops.multiply(mask_r, ImageChops.multiply(mask_g, mask_b))
+    alpha_from_white = ImageOps.invert(white_mask)  # 白色->0，非白->255
+    new_alpha = ImageChops.multiply(a, alpha_from_white)
+    img.putalpha(new_alpha)
+    return img
+
+
+def remove_white_background_in_svg(svg: str, size: tuple) -> str:
+    """
+    移除/透明化覆盖整张画布的白色背景：
+    - 处理 <rect>/<polygon>/<path> 中的白底图形
+    - 白色判断：white/#fff/#ffffff/#fefefe 等近白、rgb(>=250,>=250,>=250)
+    - 尺寸判断：接近画布尺寸或占比 >= 95%
+    若解析失败，回退到更强的正则删除常见白底元素。
+    """
+    import xml.etree.ElementTree as ET
+
+    def _parse_float(val: str) -> float:
+        try:
+            m = re.search(r"[-+]?[0-9]*\.?[0-9]+", str(val))
+            return float(m.group(0)) if m else 0.0
+        except Exception:
+            return 0.0
+
+    def _hex_to_rgb(hexstr: str):
+        h = hexstr.lstrip('#')
+        if len(h) == 3:
+            h = ''.join(ch*2 for ch in h)
+        if len(h) != 6:
+            return None
+        try:
+            return tuple(int(h[i:i+2], 16) for i in (0, 2, 4))
+        except Exception:
+            return None
+
+    def _parse_rgb(fill: str):
+        f = fill.strip().lower()
+        m = re.match(r"rgba?\(\s*([\d.]+)\s*,\s*([\d.]+)\s*,\s*([\d.]+)\s*(?:,\s*[\d.]+\s*)?\)", f)
+        if m:
+            vals = []
+            for g in m.groups()[:3]:
+                if '%' in g:
+                    try:
+                        vals.append(int(round(float(g.strip('%')) * 2.55)))
+                    except Exception:
+                        vals.append(255)
+                else:
+                    try:
+                        vals.append(int(round(float(g))))
+                    except Exception:
+                        vals.append(255)
+            return tuple(vals)
+        return None
+
+    def _is_white(fill: str) -> bool:
+        if not fill:
+            return False
+        f = fill.strip().lower().replace(" ", "")
+        if f == "white":
+            return True
+        if f.startswith('#'):
+            rgb = _hex_to_rgb(f)
+            if rgb:
+                return all(c >= 250 for c in rgb)
+            return False
+        rgb = _parse_rgb(f)
+        if rgb:
+            return all(c >= 250 for c in rgb)
+        return False
+
+    def _ensure_transparent(child, style: str):
+        # 透明化而不是删除，避免影响布局
+        child.attrib["fill"] = "none"
+        styles = {}
+        if style:
+            for part in style.split(";"):
+                if ":" in part:
+                    k, v = part.split(":", 1)
+                    styles[k.strip().lower()] = v.strip()
+        styles.pop("fill", None)
+        styles["fill"] = "none"
+        styles["fill-opacity"] = "0"
+        child.attrib["style"] = ";".join(f"{k}:{v}" for k, v in styles.items())
+
+    try:
+        root = ET.fromstring(svg)
+        canvas_w, canvas_h = size
+        tol = max(1.0, 0.02 * max(canvas_w, canvas_h))  # 2% 容差
+        min_ratio = 0.95
+        # 遍历候选元素，找到符合条件者并透明化
+        removed = False
+        for parent in root.iter():
+            for child in list(parent):
+                tag = child.tag
+                if isinstance(tag, str) and (tag.endswith("rect") or tag.endswith("polygon") or tag.endswith("path")):
+                    fill = child.attrib.get("fill")
+                    style = child.attrib.get("style", "")
+                    # 从 style 中提取 fill
+                    if not fill and style:
+                        for part in style.split(";"):
+                            if ":" in part:
+                                k, v = part.split(":", 1)
+                                if k.strip().lower() == "fill":
+                                    fill = v.strip()
+                                    break
+                    if not _is_white(fill):
+                        continue
+                    # stroke 检查：若存在描边，减少误伤
+                    stroke = child.attrib.get("stroke") or ""
+                    stroke_in_style = False
+                    if style:
+                        for part in style.split(";"):
+                            if ":" in part:
+                                k, v = part.split(":", 1)
+                                if k.strip().lower() == "stroke" and v.strip().lower() not in {"none", ""}:
+                                    stroke_in_style = True
+                                    break
+                    if stroke and stroke.lower() not in {"none", ""}:
+                        continue
+                    if stroke_in_style:
+                        continue
+
+                    fits_canvas = False
+                    if tag.endswith("rect"):
+                        w = _parse_float(child.attrib.get("width", canvas_w))
+                        h = _parse_float(child.attrib.get("height", canvas_h))
+                        x = _parse_float(child.attrib.get("x", 0))
+                        y = _parse_float(child.attrib.get("y", 0))
+                        if (abs(x) <= tol and abs(y) <= tol) and (w >= min_ratio * canvas_w and h >= min_ratio * canvas_h):
+                            fits_canvas = True
+                    elif tag.endswith("polygon"):
+                        pts = child.attrib.get("points", "")
+                        nums = re.findall(r"[-+]?\d*\.?\d+(?:e[-+]?\d+)?", pts)
+                        coords = [float(n) for n in nums]
+                        if len(coords) >= 8:
+                            xs = coords[0::2]
+                            ys = coords[1::2]
+                            minx, maxx = min(xs), max(xs)
+                            miny, maxy = min(ys), max(ys)
+                            if abs(minx) <= tol and abs(miny) <= tol and (maxx >= min_ratio * canvas_w) and (maxy >= min_ratio * canvas_h):
+                                fits_canvas = True
+                    elif tag.endswith("path"):
+                        d = child.attrib.get("d", "")
+                        nums = re.findall(r"[-+]?\d*\.?\d+(?:e[-+]?\d+)?", d)
+                        coords = [float(n) for n in nums]
+                        if len(coords) >= 8:
+                            xs = coords[0::2]
+                            ys = coords[1::2]
+                            minx, maxx = min(xs), max(xs)
+                            miny, maxy = min(ys), max(ys)
+                            if abs(minx) <= tol and abs(miny) <= tol and (maxx >= min_ratio * canvas_w) and (maxy >= min_ratio * canvas_h):
+                                fits_canvas = True
+
+                    if fits_canvas:
+                        _ensure_transparent(child, style)
+                        removed = True
+        if removed:
+            return ET.tostring(root, encoding="unicode")
+    except Exception:
+        pass
+
+    # 回退：正则替换首个匹配的白底背景（rect/path/polygon）
+    try:
+        color_pat = r"(?:#(?:fff|ffffff|fefefe)|white|rgb\(\s*25[0-9]\s*,\s*25[0-9]\s*,\s*25[0-9]\s*\))"
+        style_pat = rf"style\s*=\s*\"[^\"]*fill\s*:\s*{color_pat}[^\"]*\""
+        fill_pat = rf"fill\s*=\s*\"{color_pat}\""
+        rect_pat = rf"<rect[^>]*?(?:{fill_pat}|{style_pat})[^>]*?>"
+        poly_pat = rf"<polygon[^>]*?(?:{fill_pat}|{style_pat})[^>]*?>"
+        path_pat = rf"<path[^>]*?(?:{fill_pat}|{style_pat})[^>]*?>"
+        pattern = rf"({rect_pat}|{poly_pat}|{path_pat})"
+        return re.sub(pattern, "", svg, count=1, flags=re.IGNORECASE)
+    except Exception:
+        return svg
+
+
+def _chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+
+def _open_output(path):
+    """
+    path 可以是文件路径，也可以是已打开的二进制文件对象（如 io.BytesIO，需位于起始位置）。
+    返回 (文件对象, 是否由本模块负责关闭)。
+    """
+    if hasattr(path, "write"):
+        return path, False
+    return open(path, "wb"), True
+
+
+def _discard_output(fp, owned: bool):
+    """
+    写出失败时丢弃输出：由本模块打开的文件关闭后删除，避免留下看似正常的半截图像；
+    调用方传入的文件对象保持不动。
+    """
+    if not owned:
+        return
+    try:
+        fp.close()
+    except Exception:
+        pass
+    try:
+        Path(fp.name).unlink()
+    except OSError:
+        pass
+
+
+class PngStreamWriter:
+    """
+    逐行写出 PNG：每写入一批行即压缩并输出 IDAT 块，内存占用与图像高度无关。
+    """
+
+    def __init__(self, path, width: int, height: int, channels: int, dpi: int = 0, level: int = 6):
+        self.fp, self._owned = _open_output(path)
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.rows_written = 0
+        self._z = zlib.compressobj(level)
+        color_type = 6 if channels == 4 else 2
+        self.fp.write(b"\x89PNG\r\n\x1a\n")
+        self.fp.write(_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)))
+        if dpi > 0:
+            ppm = int(round(dpi / 0.0254))
+            self.fp.write(_chunk(b"pHYs", struct.pack(">IIB", ppm, ppm, 1)))
+
+    def write_rows(self, data, rows: int):
+        """
+        data 为 bytes 或 memoryview；逐行送入压缩器，不拼接整批数据的副本。
+        """
+        stride = self.width * self.channels
+        data = memoryview(data).cast("B")
+        out = []
+        pending = 0
+        for i in range(rows):
+            out.append(self._z.compress(b"\x00"))  # 过滤类型 None
+            out.append(self._z.compress(data[i * stride:(i + 1) * stride]))
+            pending += len(out[-1]) + len(out[-2])
+            if pending >= IDAT_CHUNK_SIZE:
+                self.fp.write(_chunk(b"IDAT", b"".join(out)))
+                out, pending = [], 0
+        if pending:
+            self.fp.write(_chunk(b"IDAT", b"".join(out)))
+        self.rows_written += rows
+
+    def close(self):
+        tail = self._z.flush()
+        if tail:
+            self.fp.write(_chunk(b"IDAT", tail))
+        self.fp.write(_chunk(b"IEND", b""))
+        if self._owned:
+            self.fp.close()
+
+    def abort(self):
+        _discard_output(self.fp, self._owned)
+
+
+class TiffStreamWriter:
+    """
+    逐条带写出未压缩 TIFF（小端，经典 TIFF，单文件不超过 4GB）。
+    条带数据顺序写入，IFD 与偏移表在结束时追加并回填头部偏移。
+    """
+
+    def __init__(self, path, width: int, height: int, channels: int, dpi: int = 0, rows_per_strip: int = 1):
+        if width * height * channels >= 0xFFFFFFFF:
+            raise ValueError("图像超过 4GB，经典 TIFF 无法容纳，请改用 PNG")
+        self.fp, self._owned = _open_output(path)
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.dpi = dpi
+        self.rows_per_strip = rows_per_strip
+        self.rows_written = 0
+        self.offsets = []
+        self.counts = []
+        self.fp.write(b"II*\x00" + struct.pack("<I", 0))
+
+    def write_rows(self, data, rows: int):
+        data = memoryview(data).cast("B")
+        self.offsets.append(self.fp.tell())
+        self.counts.append(len(data))
+        self.fp.write(data)
+        self.rows_written += rows
+
+    def _append(self, fmt: str, values) -> int:
+        if self.fp.tell() % 2:
+            self.fp.write(b"\x00")
+        pos = self.fp.tell()
+        self.fp.write(struct.pack("<" + fmt * len(values), *values))
+        return pos
+
+    def close(self):
+        n = self.channels
+        bits_pos = self._append("H", [8] * n)
+        off_pos = self._append("I", self.offsets)
+        cnt_pos = self._append("I", self.counts)
+        res_pos = self._append("I", [max(1, self.dpi), 1])
+        # (tag, type, count, value)；type: 3=SHORT 4=LONG 5=RATIONAL
+        entries = [
+            (256, 4, 1, self.width),
+            (257, 4, 1, self.height),
+            (258, 3, n, bits_pos),
+            (259, 3, 1, 1),  # 无压缩
+            (262, 3, 1, 2),  # RGB
+            (273, 4, len(self.offsets), off_pos if len(self.offsets) > 1 else self.offsets[0]),
+            (277, 3, 1, n),
+            (278, 4, 1, self.rows_per_strip),
+            (279, 4, len(self.counts), cnt_pos if len(self.counts) > 1 else self.counts[0]),
+            (282, 5, 1, res_pos),
+            (283, 5, 1, res_pos),
+            (284, 3, 1, 1),
+            (296, 3, 1, 2 if self.dpi > 0 else 1),  # 英寸 / 无单位
+        ]
+        if n == 4:
+            entries.append((338, 3, 1, 2))  # 非预乘 Alpha
+        ifd_pos = self._append("H", [len(entries)])
+        for tag, typ, count, value in entries:
+            if typ == 3 and count == 1:
+                self.fp.write(struct.pack("<HHIHH", tag, typ, count, value, 0))
+            else:
+                self.fp.write(struct.pack("<HHII", tag, typ, count, value))
+        self.fp.write(struct.pack("<I", 0))
+        self.fp.seek(4)
+        self.fp.write(struct.pack("<I", ifd_pos))
+        self.fp.seek(0, io.SEEK_END)
+        if self._owned:
+            self.fp.close()
+
+    def abort(self):
+        _discard_output(self.fp, self._owned)
+
+
+def pixel_size(rect, dpi: int):
+    """
+    返回选区按 dpi 渲染后的像素尺寸 (width, height)，与 get_pixmap(clip=rect) 一致。
+    """
+    mat = fitz.Matrix(dpi / 72.0, dpi / 72.0)
+    ir = (fitz.Rect(rect) * mat).irect
+    return ir.width, ir.height
+
+
+def render_png_strips(page, rect, dpi: int, out_path, alpha: bool = True, remove_bg: bool = False,
+                      memory_budget: int = DEFAULT_MEMORY_BUDGET, progress=None, fmt: str = None):
+    """
+    按水平条带栅格化 page 的 rect 区域并流式写入 PNG/TIFF。
+
+    - out_path 为路径或二进制文件对象；fmt 为 "PNG"/"TIFF"，缺省按扩展名 .tif/.tiff 选择 TIFF；
+    - 页面内容只解析一次（DisplayList），每个条带以 clip 单独渲染；
+    - 单个条带的像素缓冲不超过 memory_budget，峰值内存与整幅图像尺寸无关；
+    - 条带间留有 STRIP_OVERLAP 行重叠后再裁掉；文字与填充与一次性渲染逐像素一致，
+      描边（线条、曲线轮廓）的抗锯齿随 clip 变化，个别像素可能相差少许灰阶；
+    - progress(done_rows, total_rows) 可选，用于进度回调。
+    返回输出图像的像素尺寸 (width, height)。
+    """
+    mat = fitz.Matrix(dpi / 72.0, dpi / 72.0)
+    ir = (fitz.Rect(rect) * mat).irect
+    width, height = ir.width, ir.height
+    if width <= 0 or height <= 0:
+        raise ValueError("选区为空，无法渲染")
+    # 去白底需要 Alpha 通道
+    alpha = alpha or remove_bg
+    channels = 4 if alpha else 3
+    row_bytes = width * channels
+    # 每个条带同一时刻只有 MuPDF 像素缓冲一份整带数据（行直接从其内存视图送入写出器）；
+    # 去白底需要额外的整带副本，条带相应缩小
+    copies = 1 + (REMOVE_BG_COPIES if remove_bg else 0)
+    rows = max(1, memory_budget // (row_bytes * copies) - 2 * STRIP_OVERLAP)
+    rows = min(rows, height)
+
+    if fmt is None:
+        suffix = "" if hasattr(out_path, "write") else Path(out_path).suffix.lower()
+        fmt = "TIFF" if suffix in (".tif", ".tiff") else "PNG"
+    if fmt.upper() == "TIFF":
+        writer = TiffStreamWriter(out_path, width, height, channels, dpi=dpi, rows_per_strip=rows)
+    else:
+        writer = PngStreamWriter(out_path, width, height, channels, dpi=dpi)
+
+    try:
+        # 纯图片选区：原图数据与输出都在预算内时直接裁剪缩放，不重新栅格化页面
+        info = find_image_source(page, rect)
+        # 估算：解码后的原图 + 裁剪缩放结果、模式转换与字节串各一份（去白底另计副本）
+        out_bytes = width * height * 4
+        fast_cost = info["width"] * info["height"] * 4 + out_bytes * (3 + (REMOVE_BG_COPIES if remove_bg else 0)) \
+            if info is not None else 0
+        if info is not None and fast_cost <= memory_budget:
+            img = extract_region_image(page.parent, info, rect, (width, height))
+            if remove_bg:
+                img = remove_white_background(img)
+            writer.write_rows(img.convert("RGBA" if alpha else "RGB").tobytes(), height)
+            if progress:
+                progress(height, height)
+            writer.close()
+            return width, height
+
+        dl = page.get_displaylist()
+        inv = ~mat
+        for y0 in range(ir.y0, ir.y1, rows):
+            y1 = min(y0 + rows, ir.y1)
+            band = fitz.IRect(ir.x0, max(ir.y0, y0 - STRIP_OVERLAP), ir.x1, min(ir.y1, y1 + STRIP_OVERLAP))
+            pix = dl.get_pixmap(matrix=mat, alpha=alpha, clip=fitz.Rect(band) * inv)
+            # 浮点误差可能使条带偏移一像素，按实际 irect 定位所需行
+            pir = fitz.IRect(pix.irect)
+            stride = pix.stride
+            start = (y0 - pir.y0) * stride
+            # samples_mv 是像素缓冲的内存视图，切片不复制数据
+            data = pix.samples_mv[start:start + (y1 - y0) * stride]
+            if pir.x0 != ir.x0 or stride != row_bytes or len(data) != (y1 - y0) * row_bytes:
+                raise RuntimeError(f"条带渲染尺寸不一致: {pir} / {ir}")
+            if remove_bg:
+                img = Image.frombytes("RGBA", (width, y1 - y0), data)
+                data = remove_white_background(img).tobytes()
+            writer.write_rows(data, y1 - y0)
+            data = pix = None
+            if progress:
+                progress(y1 - ir.y0, height)
+    except Exception:
+        writer.abort()
+        raise
+    writer.close()
+    return width, height
+
+
+# ---------- 图像型选区快速路径（扫描页等） ----------
+
+def find_image_source(page, rect):
+    """
+    若选区被一张正向放置、无蒙版的嵌入图片完全覆盖，且其上没有可见文字、矢量图形或注释
+    （常见于扫描页），返回该图片的 get_image_info 信息，否则返回 None。
+    OCR 层的不可见文字（渲染模式 3）不影响判断；存在未完整覆盖选区的裁剪路径，
+    或页面资源中有透明度 / 软蒙版 / 混合模式设置时一律返回 None。
+    """
+    rect = fitz.Rect(rect)
+    if page.rotation or rect.is_empty:
+        return None
+    for annot in page.annots():
+        if annot.rect.intersects(rect):
+            return None
+    infos = [i for i in page.get_image_info(xrefs=True) if fitz.Rect(i["bbox"]).intersects(rect)]
+    if len(infos) != 1:
+        return None
+    info = infos[0]
+    a, b, c, d = info["transform"][:4]
+    if info["xref"] <= 0 or info.get("has-mask") or abs(b) > 1e-6 or abs(c) > 1e-6 or a <= 0 or d <= 0:
+        return None
+    doc = page.parent
+    if doc.xref_get_key(info["xref"], "ImageMask")[1] == "true":
+        return None
+    bbox = fitz.Rect(info["bbox"])
+    if not fitz.Rect(bbox.x0 - 0.5, bbox.y0 - 0.5, bbox.x1 + 0.5, bbox.y1 + 0.5).contains(rect):
+        return None
+    for t in page.get_texttrace():
+        if t["type"] == 3 or t.get("opacity", 1) == 0:
+            continue
+        if fitz.Rect(t["bbox"]).intersects(rect):
+            return None
+    for dr in page.get_drawings(extended=True):
+        if dr.get("type") == "clip":
+            # 裁剪路径无法确定作用于哪些内容（设计软件常把置入图片裁到图框内）：
+            # 只要不完整覆盖选区就放弃快速路径
+            if not fitz.Rect(dr["scissor"]).contains(rect):
+                return None
+            continue
+        if dr.get("type") == "group" or "rect" not in dr:
+            continue
+        r = fitz.Rect(dr["rect"])
+        # 图片下方的整页底色不影响结果
+        if r.contains(bbox):
+            continue
+        if r.x0 <= rect.x1 and rect.x0 <= r.x1 and r.y0 <= rect.y1 and rect.y0 <= r.y1:
+            return None
+    if _alters_opacity(doc, page):
+        return None
+    return info
+
+
+_OPACITY_RE = re.compile(rb"/(?:ca|CA)\s*(?:0*\.\d+|0)(?![\d.])|/SMask\s*(?:\d+\s+\d+\s+R|<<)|/BM\s*/(?!Normal\b|Compatible\b)")
+
+
+def _alters_opacity(doc, page) -> bool:
+    """
+    页面资源（含表单 XObject 的资源、继承自页面树的资源）中是否有改变透明度的图形状态：
+    非 1 的 /ca、/CA，软蒙版 /SMask，或非 Normal 的混合模式。保守判断：有则不走快速路径。
+    """
+    stack = []
+    xref = page.xref
+    while True:
+        kind, value = doc.xref_get_key(xref, "Resources")
+        if kind != "null":
+            text = value.encode("latin-1")
+            if _OPACITY_RE.search(text):
+                return True
+            stack.extend(int(m.group(1)) for m in _REF_RE.finditer(text))
+            break
+        parent = doc.xref_get_key(xref, "Parent")
+        if parent[0] != "xref":
+            break
+        xref = int(parent[1].split()[0])
+    seen = set()
+    while stack:
+        xref = stack.pop()
+        if xref in seen or not 0 < xref < doc.xref_length():
+            continue
+        seen.add(xref)
+        if doc.xref_get_key(xref, "Type") == ("name", "/Page"):
+            continue
+        text = _BACKREF_RE.sub(b"", doc.xref_object(xref, compressed=True).encode("latin-1"))
+        if _OPACITY_RE.search(text):
+            return True
+        stack.extend(int(m.group(1)) for m in _REF_RE.finditer(text))
+    return False
+
+
+def _native_jpeg(doc, info):
+    """
+    返回可原样使用的 JPEG 数据（RGB/灰度、无 Decode 数组），否则 None。
+    """
+    xref = info["xref"]
+    if doc.xref_get_key(xref, "Filter")[1] != "/DCTDecode" or doc.xref_get_key(xref, "Decode")[0] != "null":
+        return None
+    if info.get("colorspace") not in (1, 3):
+        return None
+    return doc.xref_stream_raw(xref)
+
+
+def _decode_image(doc, info, reduce_to=None) -> Image.Image:
+    """
+    解码嵌入图片为 RGB/L 位图。JPEG 直接交给 Pillow 解码，并可借助 draft
+    在解码阶段按 2 的幂缩小到不低于 reduce_to 的尺寸；其它编码（JBIG2、JPX、Flate 等）由 MuPDF 解码。
+    """
+    data = _native_jpeg(doc, info)
+    if data is not None:
+        img = Image.open(io.BytesIO(data))
+        if reduce_to:
+            img.draft(img.mode, reduce_to)
+        img.load()
+        return img
+    pix = fitz.Pixmap(doc, info["xref"])
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)
+    if pix.colorspace is None or pix.colorspace.n not in (1, 3):
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+    mode = "L" if pix.n == 1 else "RGB"
+    return Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+
+
+def extract_region_image(doc, info, rect, size=None) -> Image.Image:
+    """
+    直接从嵌入图片的原始数据中裁剪选区（不经过页面重新栅格化），返回 RGBA 位图。
+    size=(w, h) 时缩放到该尺寸，否则保持图片原生分辨率。
+    """
+    rect = fitz.Rect(rect)
+    bbox = fitz.Rect(info["bbox"])
+    iw, ih = info["width"], info["height"]
+    # 选区在图片像素坐标中的位置（原生分辨率）
+    sx, sy = iw / bbox.width, ih / bbox.height
+    box = (
+        max(0.0, (rect.x0 - bbox.x0) * sx),
+        max(0.0, (rect.y0 - bbox.y0) * sy),
+        min(float(iw), (rect.x1 - bbox.x0) * sx),
+        min(float(ih), (rect.y1 - bbox.y0) * sy),
+    )
+    if size is None:
+        size = (max(1, int(round(box[2] - box[0]))), max(1, int(round(box[3] - box[1]))))
+    # 解码时只需保证裁剪区域不小于目标尺寸
+    reduce_to = (
+        int(math.ceil(size[0] * iw / max(1e-6, box[2] - box[0]))),
+        int(math.ceil(size[1] * ih / max(1e-6, box[3] - box[1]))),
+    )
+    img = _decode_image(doc, info, reduce_to)
+    if img.size != (iw, ih):
+        fx, fy = img.width / iw, img.height / ih
+        box = (box[0] * fx, box[1] * fy, box[2] * fx, box[3] * fy)
+    img = img.resize(size, Image.LANCZOS, box=box, reducing_gap=3.0)
+    return img.convert("RGBA")
+
+
+def image_asset(doc, info):
+    """
+    返回 SVG 外部引用用的图片文件 (文件名, 数据)：可原样使用的 JPEG 直接取原始数据（无重新压缩），
+    其余转为无损 PNG。文件名按图片内容摘要命名，同一图片在多个导出中只需写一份。
+    """
+    digest = info["digest"].hex()[:16]
+    data = _native_jpeg(doc, info)
+    if data is not None:
+        return f"img_{digest}.jpg", data
+    buf = io.BytesIO()
+    _decode_image(doc, info).save(buf, format="PNG")
+    return f"img_{digest}.png", buf.getvalue()
+
+
+def image_region_svg(rect, info, href: str) -> str:
+    """
+    生成只引用外部图片的 SVG：画布为选区尺寸，图片按其在页面上的位置放置，超出部分由画布裁掉。
+    """
+    rect = fitz.Rect(rect)
+    bbox = fitz.Rect(info["bbox"])
+    return (
+        '<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" version="1.1" '
+        f'width="{rect.width:g}" height="{rect.height:g}" viewBox="0 0 {rect.width:g} {rect.height:g}">\n'
+        f'<image x="{bbox.x0 - rect.x0:g}" y="{bbox.y0 - rect.y0:g}" width="{bbox.width:g}" height="{bbox.height:g}" '
+        f'preserveAspectRatio="none" xlink:href="{href}"/>\n'
+        '</svg>\n'
+    )
+
+
+def crop_svg(doc, page_index: int, rect, remove_bg: bool = False) -> str:
+    """
+    生成严格按选区裁剪的 SVG：将选区作为 clip 显示到一张与选区同尺寸的新页面上。
+    """
+    rect = fitz.Rect(rect)
+    tmp_doc = fitz.open()
+    try:
+        new_page = tmp_doc.new_page(width=rect.width, height=rect.height)
+        # 将源 PDF 页的选定区域显示到新页上（坐标原点对齐到 (0,0)）
+        new_page.show_pdf_page(new_page.rect, doc, page_index, clip=rect)
+        svg = new_page.get_svg_image()
+    finally:
+        try:
+            tmp_doc.close()
+        except Exception:
+            pass
+    # 可选：去除白底背景（仅移除覆盖全画布的白色矩形），保持其它元素
+    if remove_bg:
+        try:
+            svg = remove_white_background_in_svg(svg, (float(rect.width), float(rect.height)))
+        except Exception:
+            pass
+    return svg
+
+
+def build_svg(doc, page_index: int, rect, remove_bg: bool = False, link_images: bool = True):
+    """
+    生成选区 SVG，返回 (svg, asset)。选区为纯图片（扫描页）且 link_images 时，
+    SVG 以相对路径引用外部图片，asset 为需要与 SVG 放在同一目录的 (文件名, 数据)；否则 asset 为 None。
+    去白底需要改写图片像素，此时不走外部引用。
+    """
+    if link_images and not remove_bg:
+        info = find_image_source(doc[page_index], rect)
+        if info is not None:
+            name, data = image_asset(doc, info)
+            return image_region_svg(rect, info, name), (name, data)
+    return crop_svg(doc, page_index, rect, remove_bg=remove_bg), None
+
+
+def write_asset(path, data: bytes) -> Path:
+    """
+    写出按内容命名的资源文件：同名且大小一致时视为已存在，不重复写入；
+    先写临时文件再替换，多个进程同时写同一资源也不会读到半截文件。
+    """
+    path = Path(path)
+    if path.exists() and path.stat().st_size == len(data):
+        return path
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return path
+
+
+def write_svg(doc, page_index: int, rect, svg_path, remove_bg: bool = False, link_images: bool = True,
+              assets=None):
+    """
+    写出选区 SVG 及其引用的外部图片（如有），返回写出的文件路径列表。
+    相同内容的图片文件已存在时不重复写入。
+    assets 为 SvgAssetStore 时，图片与字形写入共享资源目录，SVG 在 assets.close() 时写出。
+    """
+    svg_path = Path(svg_path)
+    svg, asset = build_svg(doc, page_index, rect, remove_bg=remove_bg, link_images=link_images)
+    written = []
+    if asset is not None:
+        name, data = asset
+        asset_dir = assets.asset_dir if assets is not None else svg_path.parent
+        written.append(write_asset(asset_dir / name, data))
+    if assets is not None:
+        assets.add(svg_path, svg)
+    else:
+        svg_path.write_text(svg, encoding="utf-8")
+    return [svg_path] + written
+
+
+_DATA_IMAGE_RE = re.compile(r'xlink:href="data:image/(png|jpeg|jpg);base64,([^"]*)"')
+_GLYPH_RE = re.compile(r'<path id="(font_[0-9_]+)" d="([^"]*)"/>\n?')
+_GLYPH_SHEET_PLACEHOLDER = "\x00glyphs\x00"
+
+
+class SvgAssetStore:
+    """
+    多个 SVG 共享的外部资源目录：同一文档批量导出时，各选区 SVG 中重复内嵌的 base64 图片
+    与字形定义只写一份，SVG 改为按文件名引用。
+
+    - 图片：按内容哈希写为 img_<哈希>.png/jpg，立即写出，已存在则跳过；
+    - 字形：以路径数据哈希重新编号后汇总，close() 时写为一个 glyphs_<内容哈希>.svg，
+      各 SVG 的 <use> 改为引用该文件中的字形；SVG 本身也在 close() 时写出。
+      字形表只在同一个 SvgAssetStore（即一次批量或监视文件夹导出）内共享，不与目录中已有的字形表合并；
+      glyphs=False 时字形保留内嵌，只外置图片，适合单个 SVG 的导出，避免每次另写一个字形表。
+
+    SVG 以文件名直接引用资源，需与资源放在同一目录（或复制到该目录）。
+    注意：外部引用在浏览器中以 <img> 方式加载 SVG 时不会被解析，需以 <object>/内联或文档方式打开。
+    """
+
+    def __init__(self, asset_dir, glyphs: bool = True):
+        self.asset_dir = Path(asset_dir)
+        self.asset_dir.mkdir(parents=True, exist_ok=True)
+        self.share_glyphs = glyphs
+        self._glyphs = {}  # 字形 id -> 路径数据
+        self._pending = []  # (SVG 路径, 含占位符的 SVG 文本)
+        self.images = set()
+
+    def _image(self, m) -> str:
+        data = base64.b64decode(m.group(2))
+        ext = "png" if m.group(1) == "png" else "jpg"
+        name = f"img_{hashlib.sha1(data).hexdigest()[:16]}.{ext}"
+        if name not in self.images:
+            write_asset(self.asset_dir / name, data)
+            self.images.add(name)
+        return f'xlink:href="{name}"'
+
+    def externalize(self, svg: str) -> str:
+        """
+        将 SVG 中的内嵌图片写为外部文件、字形定义移入共享字形表，返回改写后的 SVG（字形表文件名为占位符）。
+        """
+        svg = _DATA_IMAGE_RE.sub(self._image, svg)
+        if not self.share_glyphs:
+            return svg
+        renamed = {}
+        for old_id, d in _GLYPH_RE.findall(svg):
+            new_id = "g_" + hashlib.sha1(d.encode("ascii")).hexdigest()[:12]
+            self._glyphs[new_id] = d
+            renamed[old_id] = new_id
+        if renamed:
+            svg = _GLYPH_RE.sub("", svg)
+            svg = re.sub(
+                r'xlink:href="#(font_[0-9_]+)"',
+                lambda m: f'xlink:href="{_GLYPH_SHEET_PLACEHOLDER}#{renamed[m.group(1)]}"' if m.group(1) in renamed else m.group(0),
+                svg,
+            )
+            svg = svg.replace("<defs>\n</defs>\n", "")
+        return svg
+
+    def add(self, svg_path, svg: str):
+        self._pending.append((Path(svg_path), self.externalize(svg)))
+
+    def close(self) -> list:
+        """
+        写出共享字形表与所有待写 SVG，返回写出的文件路径列表。
+        """
+        written = []
+        sheet = ""
+        if self._glyphs:
+            body = "".join(f'<path id="{k}" d="{self._glyphs[k]}"/>\n' for k in sorted(self._glyphs))
+            data = ('<svg xmlns="http://www.w3.org/2000/svg" version="1.1">\n<defs>\n' + body + '</defs>\n</svg>\n').encode("ascii")
+            sheet = f"glyphs_{hashlib.sha1(data).hexdigest()[:16]}.svg"
+            written.append(write_asset(self.asset_dir / sheet, data))
+        for path, svg in self._pending:
+            path.write_text(svg.replace(_GLYPH_SHEET_PLACEHOLDER, sheet), encoding="utf-8")
+            written.append(path)
+        self._pending = []
+        self._glyphs = {}
+        return written
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def load_cairosvg(log=None):
+    """
+    按需导入 CairoSVG；不可用时返回 None，由调用方回退到 PyMuPDF 渲染。
+    """
+    try:
+        import cairosvg
+    except Exception as e:
+        if log:
+            log(f"CairoSVG 不可用，将使用 PyMuPDF 回退渲染。错误: {e}")
+        return None
+    return cairosvg
+
+
+def render_region(doc, page_index: int, rect, w: int, h: int, svg: str = None, cairosvg=None,
+                  source: Image.Image = None) -> Image.Image:
+    """
+    将选区渲染为 w x h 的位图：source 为从嵌入图片直接裁出的位图时只做缩放；
+    有 CairoSVG 时渲染 SVG，否则用 PyMuPDF 基于原始 PDF 选区渲染。
+    """
+    if source is not None:
+        img = source.resize((w, h), Image.LANCZOS, reducing_gap=3.0) if source.size != (w, h) else source.copy()
+    elif cairosvg is not None and svg is not None:
+        png_bytes = cairosvg.svg2png(bytestring=svg.encode("utf-8"), output_width=w, output_height=h)
+        img = Image.open(io.BytesIO(png_bytes))
+    else:
+        rect = fitz.Rect(rect)
+        tmp_doc = fitz.open()
+        try:
+            new_page = tmp_doc.new_page(width=rect.width, height=rect.height)
+            new_page.show_pdf_page(new_page.rect, doc, page_index, clip=rect)
+            mat = fitz.Matrix(w / rect.width, h / rect.height)
+            pix = new_page.get_pixmap(matrix=mat, alpha=True)
+            img = Image.frombytes("RGBA", [pix.width, pix.height], pix.samples)
+        finally:
+            try:
+                tmp_doc.close()
+            except Exception:
+                pass
+    if img.size != (w, h):
+        img = img.resize((w, h), Image.LANCZOS)
+    return img
+
+
+def ladder_size(target: int, orig_w: float, orig_h: float):
+    """
+    保持原始宽高比，按较长边为 target 计算输出尺寸。
+    """
+    if orig_w <= 0 or orig_h <= 0:
+        return target, target
+    if orig_w >= orig_h:
+        return target, max(1, int(round(target * orig_h / orig_w)))
+    return max(1, int(round(target * orig_w / orig_h))), target
+
+
+def save_formats(img: Image.Image, formats, out_path: Path, name: str, remove_bg: bool = False, log=None):
+    """
+    将同一位图按所选格式（PNG/WEBP/JPG/ICO）写出为 out_path/name.<ext>，返回写出的文件路径列表。
+    """
+    w, h = img.size
+    exported = []
+    if "PNG" in formats:
+        png_path = out_path / f"{name}.png"
+        buf = io.BytesIO()
+        img.save(buf, format="PNG")
+        png_path.write_bytes(buf.getvalue())
+        exported.append(png_path)
+        if log:
+            log(f"PNG: {png_path.name}")
+    if "WEBP" in formats:
+        webp_path = out_path / f"{name}.webp"
+        try:
+            img.save(webp_path, format="WEBP", lossless=True)
+        except Exception:
+            img.save(webp_path, format="WEBP")
+        exported.append(webp_path)
+        if log:
+            log(f"WEBP: {webp_path.name}")
+    if "JPG" in formats:
+        jpg_path = out_path / f"{name}.jpg"
+        rgb = Image.new("RGB", (w, h), (255, 255, 255))
+        if img.mode in ("RGBA", "LA"):
+            alpha = img.split()[-1]
+            rgb.paste(img.convert("RGB"), mask=alpha)
+        else:
+            rgb.paste(img)
+        rgb.save(jpg_path, format="JPEG", quality=95)
+        exported.append(jpg_path)
+        if log:
+            log(f"JPG: {jpg_path.name}")
+    if "ICO" in formats:
+        # ICO 通常支持最大 256x256，超出尺寸跳过
+        if w > 256 or h > 256:
+            if log:
+                log(f"跳过 ICO 尺寸 {w}x{h}（ICO 最大为 256）")
+        else:
+            ico_path = out_path / f"{name}.ico"
+            try:
+                img_for_ico = img
+                if img_for_ico.mode not in ("RGBA", "RGB", "P"):
+                    img_for_ico = img_for_ico.convert("RGBA")
+                # 去除白底（可选）
+                if remove_bg:
+                    try:
+                        img_for_ico = remove_white_background(img_for_ico)
+                    except Exception:
+                        pass
+                # 明确写入目标尺寸
+                img_for_ico.save(ico_path, format="ICO", sizes=[(w, h)])
+                exported.append(ico_path)
+                if log:
+                    log(f"ICO: {ico_path.name}")
+            except Exception as e:
+                if log:
+                    log(f"ICO 导出失败 {w}x{h}: {e}")
+    return exported
+
+
+def export_size_ladder(doc, page_index: int, rect, sizes, formats, out_dir, base: str = "extracted",
+                       remove_bg: bool = False, svg: str = None, cairosvg=None, log=None, progress=None,
+                       on_error=None, atlas=None):
+    """
+    批量导出尺寸阶梯：每个 target 按较长边缩放，写出所选格式，最后附加一份原始尺寸 PNG。
+
+    - 选区为纯图片（扫描页）时直接裁剪嵌入图片的原生数据并缩放，不再经 SVG/页面重新栅格化；
+    - svg 为空时按需从选区生成；cairosvg 为空时回退到 PyMuPDF 渲染；
+    - progress(done, total) 在每个文件写出后回调；
+    - 某个尺寸失败时调用 on_error(target, exc) 并停止后续尺寸（与界面行为一致）；
+      原始尺寸 PNG 失败时同样回调（target 为原始长边）。on_error 抛出的异常会向上传递；
+    - atlas 为 AtlasBuilder 时各尺寸位图加入图集（帧名 <base>_<宽>x<高>），不再单独写文件，
+      也不导出原始尺寸 PNG；图集由调用方 close() 写出。
+    返回写出的文件路径列表。
+    """
+    rect = fitz.Rect(rect)
+    orig_w, orig_h = int(rect.width), int(rect.height)
+    source = None
+    info = find_image_source(doc[page_index], rect)
+    if info is not None:
+        # 只按最大输出尺寸解码裁剪一次（JPEG 可在解码阶段缩小），各尺寸再由它缩放
+        dims = [ladder_size(t, orig_w, orig_h) for t in sizes] + [(max(1, orig_w), max(1, orig_h))]
+        source = extract_region_image(doc, info, rect, max(dims, key=lambda wh: wh[0] * wh[1]))
+        if log:
+            log(f"选区为嵌入图片（{info['width']}x{info['height']}），直接裁剪原图数据")
+    elif svg is None and cairosvg is not None:
+        svg = crop_svg(doc, page_index, rect)
+    out_path = Path(out_dir)
+    exported = []
+    total = len(sizes) if atlas is not None else len(sizes) * len(formats)
+    for target in sizes:
+        w, h = ladder_size(target, orig_w, orig_h)
+        try:
+            img = render_region(doc, page_index, rect, w, h, svg=svg, cairosvg=cairosvg, source=source)
+            # 去除白底（可选）
+            if remove_bg:
+                try:
+                    img = remove_white_background(img)
+                except Exception:
+                    pass
+            if atlas is not None:
+                atlas.add(f"{base}_{w}x{h}", img)
+                if progress:
+                    progress(len(atlas), total)
+                continue
+            exported.extend(save_formats(img, formats, out_path, f"{base}_{w}x{h}", remove_bg=remove_bg, log=log))
+            if progress:
+                progress(len(exported), total)
+        except Exception as e:
+            if log:
+                log(f"失败: 尺寸 {target} 处理失败: {e}")
+            if on_error:
+                on_error(target, e)
+            break
+
+    # 原始尺寸的 PNG 也导出一份（若可用）
+    if atlas is None and orig_w > 0 and orig_h > 0:
+        try:
+            img = render_region(doc, page_index, rect, orig_w, orig_h, svg=svg, cairosvg=cairosvg, source=source)
+            if remove_bg:
+                try:
+                    img = remove_white_background(img)
+                except Exception:
+                    pass
+            orig_png = out_path / f"{base}_{orig_w}x{orig_h}.png"
+            img.save(orig_png, format="PNG")
+            exported.append(orig_png)
+            if progress:
+                progress(len(exported), total)
+            if log:
+                log(f"原始尺寸 PNG: {orig_png.name}")
+        except Exception as e:
+            if log:
+                log(f"失败: 原始尺寸 PNG 处理失败: {e}")
+            if on_error:
+                on_error(max(orig_w, orig_h), e)
+    return exported
+
+
+def pack_rects(sizes, max_size: int = 2048, padding: int = 1):
+    """
+    矩形装箱（按高度降序的首次适应货架算法 FFDH）：sizes 为 [(w, h), ...]，
+    返回 (placements, sheets)：placements[i] = (图集页序号, x, y)，sheets = [(宽, 高), ...]。
+    单页边长不超过 max_size，放不下时开新页；矩形之间留 padding 像素间隔。
+    """
+    if not sizes:
+        return [], []
+    for w, h in sizes:
+        if w + padding > max_size or h + padding > max_size:
+            raise ValueError(f"尺寸 {w}x{h} 超出图集上限 {max_size}")
+    area = sum((w + padding) * (h + padding) for w, h in sizes)
+    widest = max(w for w, _ in sizes) + padding
+    sheet_w = min(max_size, max(widest, int(math.ceil(math.sqrt(area)))))
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0]))
+    placements = [None] * len(sizes)
+    sheets = []
+    shelves = []  # 当前页的货架：[y, 高度, 已用宽度]
+    used_h = 0
+    for i in order:
+        w, h = sizes[i][0] + padding, sizes[i][1] + padding
+        shelf = next((sh for sh in shelves if h <= sh[1] and sh[2] + w <= sheet_w), None)
+        if shelf is None:
+            if used_h + h > max_size:
+                sheets.append((sheet_w, used_h))
+                shelves, used_h = [], 0
+            shelf = [used_h, h, 0]
+            shelves.append(shelf)
+            used_h += h
+        placements[i] = (len(sheets), shelf[2], shelf[0])
+        shelf[2] += w
+    sheets.append((sheet_w, used_h))
+    # 收紧每页宽度到实际使用范围
+    widths = [0] * len(sheets)
+    for (sheet, x, _), (w, _) in zip(placements, sizes):
+        widths[sheet] = max(widths[sheet], x + w)
+    return placements, [(widths[k], h - padding) for k, (_, h) in enumerate(sheets)]
+
+
+ATLAS_FORMATS = ("PNG", "WEBP")
+
+
+class AtlasBuilder:
+    """
+    图集（精灵图）输出：收集多张位图，close() 时装箱写出一页或多页 PNG/WEBP，
+    并附带坐标表 <name>.json 与 CSS 精灵样式 <name>.css，前端只需一次请求即可取得全部尺寸。
+    """
+
+    def __init__(self, out_dir, name: str = "atlas", formats=("PNG",), max_size: int = 2048, padding: int = 1):
+        self.out_dir = Path(out_dir)
+        self.name = name
+        self.formats = [f for f in formats if f in ATLAS_FORMATS] or ["PNG"]
+        self.max_size = max_size
+        self.padding = padding
+        self._frames = []  # (帧名, 位图)
+
+    def add(self, key: str, img: Image.Image):
+        self._frames.append((key, img))
+
+    def __len__(self):
+        return len(self._frames)
+
+    def close(self, log=None) -> list:
+        """
+        装箱并写出图集页、JSON 与 CSS，返回写出的文件路径列表；没有帧时不写任何文件。
+        """
+        frames, self._frames = self._frames, []
+        if not frames:
+            return []
+        placements, sheets = pack_rects([img.size for _, img in frames], self.max_size, self.padding)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        exported = []
+        meta_sheets = []
+        for k, (sw, sh) in enumerate(sheets):
+            sheet = Image.new("RGBA", (sw, sh), (0, 0, 0, 0))
+            for (key, img), (idx, x, y) in zip(frames, placements):
+                if idx == k:
+                    sheet.paste(img.convert("RGBA"), (x, y))
+            images = {}
+            for fmt in self.formats:
+                path = self.out_dir / f"{self.name}_{k}.{fmt.lower()}"
+                if fmt == "WEBP":
+                    sheet.save(path, format="WEBP", lossless=True)
+                else:
+                    sheet.save(path, format="PNG")
+                images[fmt] = path.name
+                exported.append(path)
+                if log:
+                    log(f"图集: {path.name}（{sw}x{sh}）")
+            meta_sheets.append({"images": images, "w": sw, "h": sh})
+
+        index = {
+            "sheets": meta_sheets,
+            "frames": {
+                key: {"sheet": idx, "x": x, "y": y, "w": img.width, "h": img.height}
+                for (key, img), (idx, x, y) in zip(frames, placements)
+            },
+        }
+        json_path = self.out_dir / f"{self.name}.json"
+        json_path.write_text(json.dumps(index, ensure_ascii=False, indent=2), encoding="utf-8")
+        exported.append(json_path)
+
+        css = []
+        for (key, img), (idx, x, y) in zip(frames, placements):
+            cls = re.sub(r"[^A-Za-z0-9_-]", "_", f"{self.name}-{key}")
+            url = meta_sheets[idx]["images"][self.formats[0]]
+            css.append(
+                f".{cls} {{ background: url({url}) {-x}px {-y}px no-repeat; "
+                f"width: {img.width}px; height: {img.height}px; }}"
+            )
+        css_path = self.out_dir / f"{self.name}.css"
+        css_path.write_text("\n".join(css) + "\n", encoding="utf-8")
+        exported.append(css_path)
+        return exported
+
+
+_REF_RE = re.compile(rb"(\d+)\s+(\d+)\s+R\b")
+# 指回页面树/页面的引用不属于页面内容，遍历时忽略（否则会走遍整个文档）
+_BACKREF_RE = re.compile(rb"/(?:Parent|P)\s*\d+\s+\d+\s+R")
+# 通用压缩滤镜：按解码后的数据计算摘要，重新压缩（如另存时 deflate）不改变指纹；
+# 图片编码（DCT/JPX/JBIG2 等）解码代价高，按原始数据计算
+_GENERIC_FILTERS = {"/FlateDecode", "/LZWDecode", "/ASCII85Decode", "/ASCIIHexDecode", "/RunLengthDecode"}
+_STREAM_KEYS_RE = re.compile(rb"/(?:Filter\s*(?:/\w+|\[[^\]]*\])|DecodeParms\s*(?:<<.*?>>|\[.*?\]|null)|Length\s*\d+(?:\s+\d+\s+R)?)")
+
+
+def _stream_digest(doc, xref: int, stream_cache: dict):
+    """
+    返回 (摘要, 是否按解码数据计算)；结果按 xref 缓存。
+    """
+    cached = stream_cache.get(xref)
+    if cached is None:
+        kind, value = doc.xref_get_key(xref, "Filter")
+        filters = set(re.findall(r"/\w+", value)) if kind in ("name", "array") else set()
+        decoded = filters <= _GENERIC_FILTERS
+        data = doc.xref_stream(xref) if decoded else doc.xref_stream_raw(xref)
+        cached = stream_cache[xref] = (hashlib.sha1(data or b"").digest(), decoded)
+    return cached
+
+
+def page_fingerprint(doc, page_index: int, stream_cache: dict = None) -> str:
+    """
+    页面指纹：页面对象、内容流及其引用的全部资源（字体、图片、XObject、注释等）的内容摘要。
+    对象按遍历顺序重新编号后再计算，文档重新保存导致的对象号变化不影响指纹；
+    继承的 Resources / MediaBox / CropBox / Rotate 按生效值计入。
+    stream_cache 用于在同一文档的多页之间复用共享流（如字体）的摘要。
+    """
+    page = doc[page_index]
+    if stream_cache is None:
+        stream_cache = {}
+    h = hashlib.sha1()
+    h.update(f"{tuple(page.mediabox)}|{tuple(page.cropbox)}|{page.rotation}".encode("ascii"))
+    order = {}
+    pending = []
+
+    def walk(stack):
+        while stack:
+            xref = stack.pop()
+            if xref in order or not 0 < xref < doc.xref_length():
+                continue
+            order[xref] = len(order)
+            if xref != page.xref and doc.xref_get_key(xref, "Type") == ("name", "/Page"):
+                # 经链接目标（/Dest、/A /D 等）到达的其它页面只作占位，不计入其内容，
+                # 否则目录页、翻页链接会让一页的修改波及所有链接到它的页面
+                pending.append((b"<page>", None))
+                continue
+            text = _BACKREF_RE.sub(b"", doc.xref_object(xref, compressed=True).encode("latin-1"))
+            digest = None
+            if doc.xref_is_stream(xref):
+                digest, decoded = _stream_digest(doc, xref, stream_cache)
+                if decoded:
+                    text = _STREAM_KEYS_RE.sub(b"", text)
+            pending.append((text, digest))
+            stack.extend(int(m.group(1)) for m in reversed(list(_REF_RE.finditer(text))))
+
+    walk([page.xref])
+    # 从页面树继承的属性：其值（可能是引用）与页面自身对象一样遍历，引用的资源内容计入指纹
+    for key in ("Resources", "MediaBox", "CropBox"):
+        if doc.xref_get_key(page.xref, key)[0] != "null":
+            continue
+        parent = doc.xref_get_key(page.xref, "Parent")
+        while parent[0] == "xref":
+            pxref = int(parent[1].split()[0])
+            kind, value = doc.xref_get_key(pxref, key)
+            if kind != "null":
+                text = f"/{key} {value}".encode("latin-1")
+                pending.append((text, None))
+                walk([int(m.group(1)) for m in reversed(list(_REF_RE.finditer(text)))])
+                break
+            parent = doc.xref_get_key(pxref, "Parent")
+    for text, digest in pending:
+        h.update(_REF_RE.sub(lambda m: b"#%d" % order.get(int(m.group(1)), -1), text))
+        if digest is not None:
+            h.update(digest)
+    return h.hexdigest()
+
+
+class FingerprintManifest:
+    """
+    增量导出清单：在输出目录中记录每页指纹及其导出文件（.fingerprints.json）。
+    再次导出同一文档的新版本时，指纹未变且文件齐全的页面可跳过；导出选项变化时全部失效。
+    """
+
+    FILE_NAME = ".fingerprints.json"
+
+    def __init__(self, out_dir, options: dict = None):
+        self.path = Path(out_dir) / self.FILE_NAME
+        self.options = hashlib.sha1(json.dumps(options or {}, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        self.pages = {}
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = {}
+        self.pages = data.get("pages") or {}
+        if data.get("options") != self.options:
+            # 导出选项变化：所有页面都需重新导出，但保留旧文件列表以便清理不再生成的文件
+            self.pages = {k: {"fingerprint": None, "files": v.get("files", [])} for k, v in self.pages.items()}
+
+    def unchanged(self, page_index: int, fingerprint: str) -> bool:
+        entry = self.pages.get(str(page_index + 1))
+        if not entry or entry.get("fingerprint") != fingerprint:
+            return False
+        base = self.path.parent
+        return all((base / name).exists() for name in entry.get("files", []))
+
+    def record(self, page_index: int, fingerprint: str, files):
+        """
+        记录页面的新指纹与导出文件；旧版本导出而本次不再生成的文件（如选区数减少）一并删除。
+        """
+        names = sorted({Path(f).name for f in files})
+        old = self.pages.get(str(page_index + 1)) or {}
+        for name in set(old.get("files", [])) - set(names):
+            p = self.path.parent / name
+            if p.exists():
+                p.unlink()
+        self.pages[str(page_index + 1)] = {"fingerprint": fingerprint, "files": names}
+
+    def prune(self, page_count: int) -> list:
+        """
+        删除新版本中已不存在的页面（页数减少）的导出文件，返回删除的文件路径列表。
+        """
+        removed = []
+        for key in [k for k in self.pages if int(k) > page_count]:
+            for name in self.pages.pop(key).get("files", []):
+                p = self.path.parent / name
+                if p.exists():
+                    p.unlink()
+                    removed.append(p)
+        return removed
+
+    def save(self):
+        data = {"version": 1, "options": self.options, "pages": self.pages}
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def auto_regions(page, gap: float = 4.0, min_size: float = 4.0, include_text: bool = False):
+    """
+    自动识别页面上的图形区域：收集矢量绘图与图片（可选文字块）的包围盒，
+    将间距不超过 gap 的包围盒合并为一个区域。覆盖整页的背景绘图会被忽略。
+    返回按阅读顺序（自上而下、自左而右）排列的页面坐标矩形列表。
+    """
+    area = page.rect
+    boxes = []
+    for d in page.get_drawings():
+        r = fitz.Rect(d["rect"])
+        if r.width <= 0 and r.height <= 0:
+            continue
+        if r.width >= 0.95 * area.width and r.height >= 0.95 * area.height:
+            continue
+        boxes.append(r)
+    for info in page.get_image_info():
+        boxes.append(fitz.Rect(info["bbox"]))
+    if include_text:
+        for b in page.get_text("blocks"):
+            boxes.append(fitz.Rect(b[:4]))
+
+    # 反复合并相交（含 gap 容差）的包围盒，直到不再变化
+    merged = True
+    while merged:
+        merged = False
+        out = []
+        for r in boxes:
+            # 手工比较坐标：水平/竖直线段的包围盒宽或高为 0，不能用 intersects
+            for o in out:
+                if r.x0 - gap <= o.x1 and o.x0 - gap <= r.x1 and r.y0 - gap <= o.y1 and o.y0 - gap <= r.y1:
+                    o.x0, o.y0 = min(o.x0, r.x0), min(o.y0, r.y0)
+                    o.x1, o.y1 = max(o.x1, r.x1), max(o.y1, r.y1)
+                    merged = True
+                    break
+            else:
+                out.append(fitz.Rect(r))
+        boxes = out
+
+    regions = []
+    for r in boxes:
+        r = r & area
+        if r.width >= min_size and r.height >= min_size:
+            regions.append(r)
+    regions.sort(key=lambda r: (round(r.y0), r.x0))
+    return regions
@@ -0,0 +1,336 @@
+"""
+监视文件夹（hot folder）守护进程：持续处理投放到输入目录中的 PDF。
+
+新文件在大小与修改时间稳定后被认领（移入 .processing），按作业配置（job profile）
+交给有界进程池导出；完成后移入 done，失败则移入 failed 并附带错误信息。
+在途任务达到上限时不再认领新文件（背压），多余文件留在输入目录等待。
+
+用法：
+  python hot_folder.py 输入目录 --profile profile.json [--output 输出目录] [--workers 2]
+
+作业配置（JSON）示例：
+  {
+    "pages": "all",              # "all" 或 1 起始页码列表，如 [1, 3]
+    "regions": "page",           # "page" 整页 / "auto" 自动识别 / [[x0, y0, x1, y1], ...] 页面坐标
+    "sizes": [64, 128, 256],     # 尺寸阶梯（按长边）
+    "formats": ["SVG", "PNG"],   # SVG / PNG / WEBP / JPG / ICO
+    "remove_bg": false,          # 去除白底背景
+    "dpi": 0,                    # > 0 时额外按该 DPI 条带渲染一份完整 PNG
+    "auto_gap": 4.0,             # 自动识别时的合并间距（pt）
+    "auto_text": false,          # 自动识别时是否包含文字块
+    "svg_assets": false,         # true 时各 SVG 的内嵌图片与字形写为共享文件，每个 PDF 只写一份
+    "atlas": false,              # true 时所有选区的尺寸阶梯合并为 <文件名>_atlas 图集（PNG/WEBP + JSON/CSS）
+    "incremental": true          # 同名 PDF 再次投放时只重新导出指纹变化的页面（图集模式下不生效）
+  }
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import shutil
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import fitz  # PyMuPDF
+
+import export_engine
+
+
+log = logging.getLogger("hot_folder")
+
+DEFAULT_PROFILE = {
+    "pages": "all",
+    "regions": "page",
+    "sizes": [64, 128, 256],
+    "formats": ["SVG", "PNG"],
+    "remove_bg": False,
+    "dpi": 0,
+    "auto_gap": 4.0,
+    "auto_text": False,
+    "svg_assets": False,
+    "atlas": False,
+    "incremental": True,
+}
+IMAGE_FORMATS = ("PNG", "WEBP", "JPG", "ICO")
+# 子进程异常退出（如 MuPDF 崩溃）时的最大重试次数
+MAX_RETRIES = 1
+
+
+def load_profile(path) -> dict:
+    """
+    读取作业配置并补齐缺省值；格式名统一为大写。
+    """
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    profile = dict(DEFAULT_PROFILE)
+    profile.update(data)
+    profile["formats"] = [str(f).upper() for f in profile["formats"]]
+    profile["sizes"] = sorted({int(s) for s in profile["sizes"] if int(s) > 0})
+    return profile
+
+
+def _profile_pages(doc, pages):
+    if pages == "all":
+        return list(range(doc.page_count))
+    return [p - 1 for p in pages if 1 <= p <= doc.page_count]
+
+
+def _profile_regions(page, profile):
+    regions = profile["regions"]
+    if regions == "page":
+        return [page.rect]
+    if regions == "auto":
+        return export_engine.auto_regions(page, gap=float(profile["auto_gap"]), include_text=bool(profile["auto_text"]))
+    out = []
+    for r in regions:
+        rect = fitz.Rect(r) & page.rect
+        if not rect.is_empty:
+            out.append(rect)
+    return out
+
+
+def _raise_ladder_error(target, exc):
+    """
+    尺寸阶梯中任一尺寸失败即视为整个文件失败：不留下部分输出被当作完成（也不会被记入增量清单）。
+    """
+    raise RuntimeError(f"尺寸 {target} 导出失败: {type(exc).__name__}: {exc}") from exc
+
+
+def process_pdf(pdf_path, profile: dict, out_root) -> int:
+    """
+    按作业配置导出一个 PDF，输出到 out_root/<文件名>/，返回写出的文件数。
+    在子进程中运行：文档在进程内打开，进程间只传递路径与配置。
+    增量模式下输出目录中保存每页指纹，同一文档的新版本只重新导出指纹变化的页面，其余输出保持不动。
+    """
+    pdf_path = Path(pdf_path)
+    out_dir = Path(out_root) / pdf_path.stem
+    formats = profile["formats"]
+    image_formats = [f for f in formats if f in IMAGE_FORMATS]
+    remove_bg = bool(profile["remove_bg"])
+    dpi = int(profile.get("dpi") or 0)
+    cairosvg = export_engine.load_cairosvg() if image_formats and profile["sizes"] else None
+    count = 0
+    doc = fitz.open(pdf_path)
+    assets = None
+    try:
+        out_dir.mkdir(parents=True, exist_ok=True)
+        if "SVG" in formats and profile.get("svg_assets"):
+            assets = export_engine.SvgAssetStore(out_dir)
+        atlas = None
+        if image_formats and profile["sizes"] and profile.get("atlas"):
+            atlas = export_engine.AtlasBuilder(out_dir, name=f"{pdf_path.stem}_atlas", formats=image_formats)
+        # 图集需要全部页面的位图，不能跳过页面
+        manifest = None
+        if profile.get("incremental", True) and atlas is None:
+            manifest = export_engine.FingerprintManifest(out_dir, profile)
+            for p in manifest.prune(doc.page_count):
+                log.info("删除已不存在页面的输出: %s", p.name)
+        stream_cache = {}
+        skipped = 0
+        for pno in _profile_pages(doc, profile["pages"]):
+            page = doc[pno]
+            fingerprint = None
+            if manifest is not None:
+                fingerprint = export_engine.page_fingerprint(doc, pno, stream_cache)
+                if manifest.unchanged(pno, fingerprint):
+                    skipped += 1
+                    continue
+            page_files = []
+            for k, rect in enumerate(_profile_regions(page, profile), 1):
+                base = f"{pdf_path.stem}_p{pno + 1}_r{k}"
+                if "SVG" in formats:
+                    page_files += export_engine.write_svg(
+                        doc, pno, rect, out_dir / f"{base}.svg", remove_bg=remove_bg, assets=assets)
+                if image_formats and profile["sizes"]:
+                    # 位图所需的 SVG 由引擎按需生成（纯图片选区直接裁剪原图，不经 SVG）
+                    page_files += export_engine.export_size_ladder(
+                        doc, pno, rect, profile["sizes"], image_formats, out_dir,
+                        base=base, remove_bg=remove_bg, cairosvg=cairosvg, atlas=atlas,
+                        on_error=_raise_ladder_error,
+                    )
+                if dpi > 0:
+                    png_path = out_dir / f"{base}_{dpi}dpi.png"
+                    export_engine.render_png_strips(page, rect, dpi, png_path, remove_bg=remove_bg)
+                    page_files.append(png_path)
+            count += len(page_files)
+            if manifest is not None:
+                # 只记录本页专属文件；按内容命名的共享资源（img_*、glyphs_*）可能被其它页引用，不归属某一页
+                prefix = f"{pdf_path.stem}_p{pno + 1}_"
+                manifest.record(pno, fingerprint, [p for p in page_files if Path(p).name.startswith(prefix)])
+        if atlas is not None:
+            count += len(atlas.close())
+        if assets is not None:
+            # SVG 已在上面计入，这里只补计共享字形表
+            count += sum(1 for p in assets.close() if p.name.startswith("glyphs_"))
+        if manifest is not None:
+            manifest.save()
+            if skipped:
+                log.info("%s: %d 页未变化，已跳过", pdf_path.name, skipped)
+    finally:
+        doc.close()
+    return count
+
+
+def _unique_dest(folder: Path, name: str) -> Path:
+    dest = folder / name
+    if dest.exists():
+        stem, suffix = Path(name).stem, Path(name).suffix
+        dest = folder / f"{stem}_{time.strftime('%Y%m%d%H%M%S')}{suffix}"
+    return dest
+
+
+class HotFolder:
+    """
+    扫描输入目录、认领稳定的新 PDF，并以有界进程池处理。
+    """
+
+    def __init__(self, input_dir, profile: dict, output_dir=None, done_dir=None, failed_dir=None,
+                 workers: int = 2, max_pending: int = 0, interval: float = 2.0):
+        self.input_dir = Path(input_dir)
+        self.profile = profile
+        self.output_dir = Path(output_dir) if output_dir else self.input_dir / "output"
+        self.done_dir = Path(done_dir) if done_dir else self.input_dir / "done"
+        self.failed_dir = Path(failed_dir) if failed_dir else self.input_dir / "failed"
+        self.processing_dir = self.input_dir / ".processing"
+        self.workers = max(1, workers)
+        # 在途任务上限：达到后不再认领新文件
+        self.max_pending = max_pending if max_pending > 0 else self.workers * 2
+        self.interval = interval
+        self._seen = {}  # 文件名 -> (大小, 修改时间)，用于判断是否写入完成
+        self._pending = {}  # future -> 处理中文件路径
+        self._retries = {}
+        self._pool = None
+        for d in (self.output_dir, self.done_dir, self.failed_dir, self.processing_dir):
+            d.mkdir(parents=True, exist_ok=True)
+
+    def _new_pool(self):
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+
+    def recover(self):
+        """
+        将上次异常退出时遗留在 .processing 中的文件放回输入目录重新处理。
+        """
+        for p in self.processing_dir.glob("*.pdf"):
+            shutil.move(str(p), str(_unique_dest(self.input_dir, p.name)))
+            log.info("恢复未完成文件: %s", p.name)
+
+    def _ready_files(self):
+        """
+        返回大小与修改时间在两次扫描间保持不变的 PDF（视为已写入完成），按修改时间排序。
+        """
+        ready = []
+        current = {}
+        for p in self.input_dir.iterdir():
+            if not p.is_file() or p.suffix.lower() != ".pdf":
+                continue
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            sig = (st.st_size, st.st_mtime)
+            current[p.name] = sig
+            if self._seen.get(p.name) == sig:
+                ready.append((st.st_mtime, p))
+        self._seen = current
+        return [p for _, p in sorted(ready)]
+
+    def _collect(self):
+        for fut in [f for f in self._pending if f.done()]:
+            path = self._pending.pop(fut)
+            try:
+                count = fut.result()
+            except BrokenProcessPool:
+                # 子进程崩溃会连带其它在途任务，放回输入目录重试
+                self._pool = None
+                tries = self._retries.get(path.name, 0)
+                if tries < MAX_RETRIES:
+                    self._retries[path.name] = tries + 1
+                    shutil.move(str(path), str(_unique_dest(self.input_dir, path.name)))
+                    log.warning("工作进程异常退出，重新排队: %s", path.name)
+                else:
+                    self._fail(path, "工作进程异常退出")
+            except Exception:
+                self._fail(path, traceback.format_exc())
+            else:
+                self._retries.pop(path.name, None)
+                shutil.move(str(path), str(_unique_dest(self.done_dir, path.name)))
+                log.info("完成: %s（导出 %d 个文件）", path.name, count)
+
+    def _fail(self, path: Path, reason: str):
+        self._retries.pop(path.name, None)
+        dest = _unique_dest(self.failed_dir, path.name)
+        shutil.move(str(path), str(dest))
+        dest.with_suffix(".error.txt").write_text(reason, encoding="utf-8")
+        log.error("失败: %s: %s", path.name, reason.strip().splitlines()[-1])
+
+    def run_once(self) -> int:
+        """
+        执行一轮：回收已完成任务，并在背压上限内认领新文件。返回在途任务数。
+        """
+        self._collect()
+        if len(self._pending) < self.max_pending:
+            for p in self._ready_files():
+                if len(self._pending) >= self.max_pending:
+                    break
+                claimed = self.processing_dir / p.name
+                try:
+                    p.replace(claimed)
+                except OSError:
+                    continue
+                self._seen.pop(p.name, None)
+                if self._pool is None:
+                    self._new_pool()
+                fut = self._pool.submit(process_pdf, str(claimed), self.profile, str(self.output_dir))
+                self._pending[fut] = claimed
+                log.info("开始处理: %s", p.name)
+        return len(self._pending)
+
+    def run_forever(self, once: bool = False):
+        """
+        持续运行；once=True 时处理完当前已存在的文件后退出。
+        """
+        self.recover()
+        try:
+            while True:
+                pending = self.run_once()
+                if once and pending == 0 and not any(
+                        p.suffix.lower() == ".pdf" for p in self.input_dir.iterdir() if p.is_file()):
+                    break
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            log.info("正在停止，等待在途任务完成...")
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+            self._collect()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="监视文件夹，按作业配置持续导出新 PDF")
+    ap.add_argument("input", help="输入目录（监视其中的 *.pdf）")
+    ap.add_argument("--profile", required=True, help="作业配置 JSON 文件")
+    ap.add_argument("--output", help="导出目录（默认 输入目录/output）")
+    ap.add_argument("--done", help="完成目录（默认 输入目录/done）")
+    ap.add_argument("--failed", help="失败目录（默认 输入目录/failed）")
+    ap.add_argument("--workers", type=int, default=2, help="工作进程数")
+    ap.add_argument("--max-pending", type=int, default=0, help="在途任务上限（默认 工作进程数 x 2）")
+    ap.add_argument("--interval", type=float, default=2.0, help="扫描间隔（秒）")
+    ap.add_argument("--once", action="store_true", help="处理完当前文件后退出")
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    hot = HotFolder(
+        args.input, load_profile(args.profile),
+        output_dir=args.output, done_dir=args.done, failed_dir=args.failed,
+        workers=args.workers, max_pending=args.max_pending, interval=args.interval,
+    )
+    log.info("监视目录: %s", hot.input_dir)
+    hot.run_forever(once=args.once)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
@@ -1,13 +1,39 @@
+import time
+
+# 启动计时起点：尽量早于其它导入；墙钟时间用于与操作系统记录的进程创建时间对齐
+_T0 = time.perf_counter()
+_T0_WALL = time.time()
+
 import tkinter as tk
 from tkinter import filedialog, messagebox
 from pathlib import Path
-import fitz  # PyMuPDF
-from PIL import Image, ImageTk, ImageChops, ImageOps
-import io
-import re
-import xml.etree.ElementTree as ET
+import math
+import queue
+import sys
+import threading
 from tkinter import ttk
 
+# PyMuPDF、Pillow 与导出引擎在首次使用时才导入（与 CairoSVG 相同），
+# 使窗口在打包后的程序中尽快出现
+
+_T_IMPORTS = time.perf_counter()
+
+
+# 缩略图栏：固定槽位高度，无需预先读取每页尺寸即可确定滚动范围
+THUMB_W = 110
+THUMB_H = 140
+THUMB_SLOT_H = THUMB_H + 24
+# 缩略图缓存上限（PhotoImage 个数），超出后淘汰离可见区域最远的条目
+THUMB_CACHE_SIZE = 200
+# 可见区域之外预取的页数
+THUMB_PREFETCH = 20
+# 同时交给缩略图进程的请求数：保持进程不空闲，又不让滚动后的新可见页排在太多旧请求之后
+THUMB_INFLIGHT = 2
+# 界面线程轮询缩略图结果的间隔（毫秒）
+THUMB_POLL_MS = 30
+# 条带渲染内存上限缺省值（MB），与 export_engine.DEFAULT_MEMORY_BUDGET 一致
+DEFAULT_MEMORY_BUDGET_MB = 64
+
 
 class PdfSvgGUI:
     def __init__(self, root: tk.Tk):
@@ -18,13 +44,24 @@ class PdfSvgGUI:
         toolbar = tk.Frame(root)
         toolbar.pack(fill=tk.X)
 
-        tk.Button(toolbar, text="打开PDF", command=self.open_pdf).pack(side=tk.LEFT, padx=4, pady=4)
+        self.open_btn = tk.Button(toolbar, text="打开PDF", command=self.open_pdf)
+        self.open_btn.pack(side=tk.LEFT, padx=4, pady=4)
         tk.Button(toolbar, text="上一页", command=self.prev_page).pack(side=tk.LEFT, padx=4, pady=4)
         tk.Button(toolbar, text="下一页", command=self.next_page).pack(side=tk.LEFT, padx=4, pady=4)
+        # 页码跳转
+        self.goto_var = tk.StringVar(value="")
+        goto_entry = tk.Entry(toolbar, textvariable=self.goto_var, width=5)
+        goto_entry.pack(side=tk.LEFT)
+        goto_entry.bind("<Return>", lambda e: self.goto_page_from_entry())
+        tk.Button(toolbar, text="跳转", command=self.goto_page_from_entry).pack(side=tk.LEFT, padx=4, pady=4)
 
         tk.Label(toolbar, text="DPI:").pack(side=tk.LEFT)
         self.dpi_var = tk.StringVar(value="300")
         tk.Entry(toolbar, textvariable=self.dpi_var, width=5).pack(side=tk.LEFT)
+        # 高 DPI 导出按条带渲染，单个条带的内存上限（MB）
+        tk.Label(toolbar, text="内存上限MB:").pack(side=tk.LEFT, padx=(8, 0))
+        self.mem_budget_var = tk.StringVar(value=str(DEFAULT_MEMORY_BUDGET_MB))
+        tk.Entry(toolbar, textvariable=self.mem_budget_var, width=5).pack(side=tk.LEFT)
 
         # 选框比例设置：预设 + 自定义
         tk.Label(toolbar, text="选框比例:").pack(side=tk.LEFT, padx=(8, 0))
@@ -37,9 +74,13 @@ class PdfSvgGUI:
         tk.Button(toolbar, text="导出SVG", command=self.export_svg).pack(side=tk.LEFT, padx=8)
         tk.Button(toolbar, text="导出PNG", command=self.export_png).pack(side=tk.LEFT)
         tk.Button(toolbar, text="批量导出图片", command=self.batch_export_images).pack(side=tk.LEFT, padx=8)
+        tk.Button(toolbar, text="保存选区到作业", command=self.save_selection_to_job).pack(side=tk.LEFT)
         # 去除白底背景开关
         self.remove_bg_var = tk.BooleanVar(value=False)
         tk.Checkbutton(toolbar, text="去除白底背景", variable=self.remove_bg_var).pack(side=tk.LEFT, padx=8)
+        # SVG 中的内嵌图片与字形写为同目录下按内容命名的共享文件（多次导出共用）
+        self.svg_assets_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(toolbar, text="SVG资源外置", variable=self.svg_assets_var).pack(side=tk.LEFT, padx=4)
 
         self.page_label = tk.Label(toolbar, text="")
         self.page_label.pack(side=tk.RIGHT, padx=8)
@@ -49,6 +90,21 @@ class PdfSvgGUI:
         status_bar = tk.Label(root, textvariable=self.status_var, anchor="w")
         status_bar.pack(fill=tk.X, side=tk.BOTTOM)
 
+        # 左侧缩略图栏（后台低分辨率渲染）
+        thumb_frame = tk.Frame(root)
+        thumb_frame.pack(fill=tk.Y, side=tk.LEFT)
+        self.thumb_canvas = tk.Canvas(thumb_frame, bg="#333", width=THUMB_W + 16,
+                                     highlightthickness=0, yscrollincrement=THUMB_SLOT_H)
+        thumb_scroll = tk.Scrollbar(thumb_frame, orient=tk.VERTICAL, command=self._on_thumb_scroll)
+        self.thumb_canvas.config(yscrollcommand=thumb_scroll.set)
+        thumb_scroll.pack(fill=tk.Y, side=tk.RIGHT)
+        self.thumb_canvas.pack(fill=tk.Y, side=tk.LEFT, expand=True)
+        self.thumb_canvas.bind("<Button-1>", self._on_thumb_click)
+        self.thumb_canvas.bind("<MouseWheel>", lambda e: self._on_thumb_scroll("scroll", -1 if e.delta > 0 else 1, "units"))
+        self.thumb_canvas.bind("<Button-4>", lambda e: self._on_thumb_scroll("scroll", -1, "units"))
+        self.thumb_canvas.bind("<Button-5>", lambda e: self._on_thumb_scroll("scroll", 1, "units"))
+        self.thumb_canvas.bind("<Configure>", lambda e: self._schedule_thumbs())
+
         # 画布与滚动
         self.canvas = tk.Canvas(root, bg="#222")
         self.canvas.pack(fill=tk.BOTH, expand=True)
@@ -67,6 +123,26 @@ class PdfSvgGUI:
         self.img_h = 0
         self.sel_rect = None  # (x0,y0,x1,y1) in canvas coords
         self.sel_id = None
+        # 文档打开代次：后台打开完成时据此丢弃过期结果
+        self._open_gen = 0
+        # 是否有后台打开正在进行
+        self._opening = False
+        # 懒加载的页面元数据缓存：页码 -> 尺寸 / 页标签
+        self._page_rects = {}
+        self._page_labels = {}
+        self._has_labels = False
+        # 缩略图缓存与调度
+        self._thumb_cache = {}  # 页码 -> PhotoImage
+        self._thumb_items = {}  # 页码 -> 画布图片项
+        self._thumb_job = None
+        self._thumb_sel = None
+        # 缩略图渲染进程及其请求/结果队列；已发出尚未返回的页码
+        self._thumb_proc = None
+        self._thumb_requests = None
+        self._thumb_results = None
+        self._thumb_pending = set()
+        self._thumb_poll_job = None
+        self._doc_path = None
         # 最近一次导出的/生成的 SVG 缓存
         self.last_svg = None
         self.last_svg_size = (0, 0)  # (width, height)
@@ -83,25 +159,129 @@ class PdfSvgGUI:
         self.export_sizes = [16, 24, 32, 48, 64, 96, 128, 256, 512, 1024]
         self.size_vars = {s: tk.BooleanVar(value=True) for s in self.export_sizes}
         self.custom_sizes_var = tk.StringVar(value="")
+        # 合并为图集：各尺寸装箱到 PNG/WEBP 图集页，附 JSON/CSS 坐标表，不再单独写文件
+        self.atlas_var = tk.BooleanVar(value=False)
 
     def open_pdf(self):
+        # 同一时刻只允许一个后台打开：两个线程同时进入 MuPDF 并不安全
+        if self._opening:
+            return
         path = filedialog.askopenfilename(filetypes=[("PDF", "*.pdf"), ("All Files", "*.*")])
         if not path:
             return
+        # 先关闭旧文档并停止缩略图任务：MuPDF 不支持多线程并发访问，
+        # 后台线程打开期间界面线程不再持有任何文档
+        self._open_gen += 1
+        self._close_doc()
+        self.status_var.set(f"正在打开: {Path(path).name} ...")
+        results = queue.Queue()
+        self._opening = True
+        self.open_btn.config(state=tk.DISABLED)
+        threading.Thread(target=self._open_worker, args=(path, self.zoom, results), daemon=True).start()
+        self.root.after(30, self._poll_open, self._open_gen, path, results)
+
+    @staticmethod
+    def _open_worker(path: str, zoom: float, results: queue.Queue):
+        """
+        后台线程：打开（及必要时修复）PDF，并渲染首页预览。
+        首次打开时 PyMuPDF 也在此线程中导入。
+        """
         try:
-            self.doc = fitz.open(path)
-            self.page_index = 0
-            self.render_page()
+            import fitz  # PyMuPDF
+            doc = fitz.open(path)
+            pix = None
+            if doc.page_count > 0:
+                pix = doc[0].get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=True)
+            results.put((doc, pix, None))
         except Exception as e:
-            messagebox.showerror("打开失败", str(e))
+            results.put((None, None, e))
+
+    def _poll_open(self, gen: int, path: str, results: queue.Queue):
+        try:
+            doc, pix, err = results.get_nowait()
+        except queue.Empty:
+            self.root.after(30, self._poll_open, gen, path, results)
+            return
+        # 后台线程已结束，允许再次打开
+        self._opening = False
+        self.open_btn.config(state=tk.NORMAL)
+        if gen != self._open_gen:
+            # 期间又打开了其它文件，丢弃过期结果
+            if doc is not None:
+                doc.close()
+            return
+        if err is not None:
+            self.status_var.set("就绪")
+            messagebox.showerror("打开失败", str(err))
+            return
+        self.doc = doc
+        self._doc_path = path
+        self.page_index = 0
+        self._has_labels = bool(doc.get_page_labels())
+        self.status_var.set(f"已打开: {Path(path).name}（共 {doc.page_count} 页）")
+        if pix is not None:
+            self._show_pixmap(pix)
+        self._init_thumbs()
+
+    def _close_doc(self):
+        if self._thumb_job is not None:
+            self.root.after_cancel(self._thumb_job)
+            self._thumb_job = None
+        self._stop_thumb_worker()
+        self._doc_path = None
+        self.thumb_canvas.delete("all")
+        self._thumb_cache.clear()
+        self._thumb_items.clear()
+        self._thumb_sel = None
+        self._page_rects.clear()
+        self._page_labels.clear()
+        self._has_labels = False
+        # 旧文档的 SVG 缓存不再有效
+        self.last_svg = None
+        self.last_rect = None
+        self.canvas.delete("all")
+        self.page_label.config(text="")
+        self.sel_rect = None
+        self.sel_id = None
+        if self.doc is not None:
+            try:
+                self.doc.close()
+            except Exception:
+                pass
+        self.doc = None
+
+    def _page_rect(self, index: int):
+        """
+        懒加载页面尺寸，仅在首次需要时读取该页。
+        """
+        r = self._page_rects.get(index)
+        if r is None:
+            r = self._page_rects[index] = self.doc[index].rect
+        return r
+
+    def _page_label_text(self, index: int) -> str:
+        if not self._has_labels:
+            return ""
+        label = self._page_labels.get(index)
+        if label is None:
+            try:
+                label = self.doc[index].get_label() or ""
+            except Exception:
+                label = ""
+            self._page_labels[index] = label
+        return label
 
     def render_page(self):
         if not self.doc:
             return
+        import fitz  # PyMuPDF
         page = self.doc[self.page_index]
         mat = fitz.Matrix(self.zoom, self.zoom)
         pix = page.get_pixmap(matrix=mat, alpha=True)
+        self._show_pixmap(pix)
 
+    def _show_pixmap(self, pix):
+        from PIL import Image, ImageTk
         self.img_w, self.img_h = pix.width, pix.height
         # 画布尺寸
         cw = max(400, min(self.img_w, self.root.winfo_screenwidth() - 80))
@@ -119,9 +299,12 @@ class PdfSvgGUI:
 
         self.canvas.delete("all")
         self.canvas.create_image(0, 0, anchor=tk.NW, image=self.photo)
-        self.page_label.config(text=f"第 {self.page_index + 1}/{self.doc.page_count} 页")
+        label = self._page_label_text(self.page_index)
+        suffix = f"（{label}）" if label else ""
+        self.page_label.config(text=f"第 {self.page_index + 1}/{self.doc.page_count} 页{suffix}")
         self.sel_rect = None
         self.sel_id = None
+        self._highlight_thumb()
 
     def prev_page(self):
         if not self.doc:
@@ -137,6 +320,190 @@ class PdfSvgGUI:
             self.page_index += 1
             self.render_page()
 
+    def goto_page(self, index: int):
+        if not self.doc:
+            return
+        index = max(0, min(index, self.doc.page_count - 1))
+        if index != self.page_index:
+            self.page_index = index
+            self.render_page()
+
+    def goto_page_from_entry(self):
+        try:
+            self.goto_page(int(self.goto_var.get()) - 1)
+        except ValueError:
+            pass
+
+    # ---------- 缩略图栏 ----------
+
+    def _init_thumbs(self):
+        """
+        为每页绘制占位槽（不读取页面），实际缩略图由空闲调度按可见区域优先渲染。
+        """
+        n = self.doc.page_count
+        for i in range(n):
+            y = i * THUMB_SLOT_H
+            self.thumb_canvas.create_rectangle(8, y + 4, 8 + THUMB_W, y + 4 + THUMB_H, outline="#555")
+            self.thumb_canvas.create_text(8 + THUMB_W // 2, y + THUMB_H + 14, text=str(i + 1), fill="#ccc")
+        self.thumb_canvas.config(scrollregion=(0, 0, THUMB_W + 16, n * THUMB_SLOT_H))
+        self.thumb_canvas.yview_moveto(0)
+        self._start_thumb_worker()
+        self._highlight_thumb()
+        self._schedule_thumbs()
+
+    def _on_thumb_scroll(self, *args):
+        self.thumb_canvas.yview(*args)
+        self._schedule_thumbs()
+
+    def _on_thumb_click(self, e):
+        if not self.doc:
+            return
+        self.goto_page(int(self.thumb_canvas.canvasy(e.y) // THUMB_SLOT_H))
+
+    def _visible_thumb_range(self):
+        n = self.doc.page_count
+        top, bottom = self.thumb_canvas.yview()
+        first = max(0, int(top * n))
+        last = min(n - 1, int(math.ceil(bottom * n)))
+        return first, last
+
+    def _highlight_thumb(self):
+        if not self.doc:
+            return
+        y = self.page_index * THUMB_SLOT_H
+        box = (6, y + 2, 10 + THUMB_W, y + 6 + THUMB_H)
+        if self._thumb_sel is None:
+            self._thumb_sel = self.thumb_canvas.create_rectangle(*box, outline="#00ff88", width=2)
+        else:
+            self.thumb_canvas.coords(self._thumb_sel, *box)
+        # 当前页不在可见区域时滚动到该页
+        first, last = self._visible_thumb_range()
+        if not (first <= self.page_index < last):
+            self.thumb_canvas.yview_moveto(max(0, y - THUMB_SLOT_H) / max(1, self.doc.page_count * THUMB_SLOT_H))
+            self._schedule_thumbs()
+
+    def _start_thumb_worker(self):
+        """
+        启动缩略图进程：它用自己的文档句柄渲染，界面线程只负责创建 PhotoImage。
+        """
+        import multiprocessing
+        self._thumb_requests = multiprocessing.Queue()
+        self._thumb_results = multiprocessing.Queue()
+        self._thumb_pending.clear()
+        self._thumb_proc = multiprocessing.Process(
+            target=_thumb_worker, args=(self._doc_path, self._thumb_requests, self._thumb_results), daemon=True)
+        self._thumb_proc.start()
+
+    def _stop_thumb_worker(self):
+        if self._thumb_poll_job is not None:
+            self.root.after_cancel(self._thumb_poll_job)
+            self._thumb_poll_job = None
+        proc, self._thumb_proc = self._thumb_proc, None
+        if proc is not None:
+            # 进程只读打开文档，可直接结束，无需等待正在渲染的页面
+            proc.terminate()
+            proc.join(timeout=1)
+        for q in (self._thumb_requests, self._thumb_results):
+            if q is not None:
+                q.close()
+                q.cancel_join_thread()
+        self._thumb_requests = self._thumb_results = None
+        self._thumb_pending.clear()
+
+    def _schedule_thumbs(self):
+        if self.doc is not None and self._thumb_job is None:
+            self._thumb_job = self.root.after(1, self._thumb_step)
+
+    def _next_thumb_page(self):
+        """
+        选择下一张待渲染缩略图：先可见区域，再向两侧预取 THUMB_PREFETCH 页。
+        """
+        n = self.doc.page_count
+        first, last = self._visible_thumb_range()
+        for i in range(first, last + 1):
+            if i not in self._thumb_cache and i not in self._thumb_pending:
+                return i
+        for d in range(1, THUMB_PREFETCH + 1):
+            for i in (last + d, first - d):
+                if 0 <= i < n and i not in self._thumb_cache and i not in self._thumb_pending:
+                    return i
+        return None
+
+    def _thumb_step(self):
+        """
+        按当前可见区域补足发往缩略图进程的请求，每次最多 THUMB_INFLIGHT 个在途。
+        """
+        self._thumb_job = None
+        if not self.doc or self._thumb_proc is None:
+            return
+        while len(self._thumb_pending) < THUMB_INFLIGHT:
+            index = self._next_thumb_page()
+            if index is None:
+                break
+            self._thumb_pending.add(index)
+            self._thumb_requests.put(index)
+        if self._thumb_pending and self._thumb_poll_job is None:
+            self._thumb_poll_job = self.root.after(THUMB_POLL_MS, self._poll_thumbs)
+
+    def _poll_thumbs(self):
+        """
+        取回缩略图进程的 PPM 数据并放入画布；进程意外退出时重启并跳过未完成的页。
+        """
+        self._thumb_poll_job = None
+        if self._thumb_proc is None:
+            return
+        keep_going = True
+        while True:
+            try:
+                index, ppm = self._thumb_results.get_nowait()
+            except queue.Empty:
+                break
+            if index < 0:
+                # 进程无法打开文档，缩略图保持占位
+                self._stop_thumb_worker()
+                return
+            self._thumb_pending.discard(index)
+            if not self._add_thumb(index, ppm):
+                keep_going = False
+        if self._thumb_pending and not self._thumb_proc.is_alive():
+            for index in self._thumb_pending:
+                self._thumb_cache[index] = None
+            self._stop_thumb_worker()
+            self._start_thumb_worker()
+        if keep_going:
+            self._schedule_thumbs()
+        if self._thumb_pending and self._thumb_poll_job is None:
+            self._thumb_poll_job = self.root.after(THUMB_POLL_MS, self._poll_thumbs)
+
+    def _add_thumb(self, index: int, ppm) -> bool:
+        """
+        在界面线程创建 PhotoImage 并放入缓存；刚加入的条目即被淘汰时返回 False，停止继续调度。
+        """
+        try:
+            photo = tk.PhotoImage(data=ppm, format="PPM") if ppm else None
+        except tk.TclError:
+            photo = None
+        self._thumb_cache[index] = photo
+        if photo is not None:
+            y = index * THUMB_SLOT_H
+            x = 8 + (THUMB_W - photo.width()) // 2
+            item = self.thumb_canvas.create_image(x, y + 4 + (THUMB_H - photo.height()) // 2, anchor=tk.NW, image=photo)
+            self._thumb_items[index] = item
+            if self._thumb_sel is not None:
+                self.thumb_canvas.tag_raise(self._thumb_sel)
+        # 超出缓存上限时淘汰离可见区域最远的条目
+        if len(self._thumb_cache) > THUMB_CACHE_SIZE:
+            first, last = self._visible_thumb_range()
+            centre = (first + last) / 2
+            victim = max(self._thumb_cache, key=lambda i: abs(i - centre))
+            self._thumb_cache.pop(victim, None)
+            item = self._thumb_items.pop(victim, None)
+            if item is not None:
+                self.thumb_canvas.delete(item)
+            if victim == index:
+                return False
+        return True
+
     def on_mouse_down(self, e):
         self.sel_rect = (e.x, e.y, e.x, e.y)
         if self.sel_id:
@@ -212,6 +579,7 @@ class PdfSvgGUI:
         py1 = y1 / self.scale
 
         # 像素坐标 → 页面坐标（72dpi 基础）
+        import fitz  # PyMuPDF
         rect = fitz.Rect(px0 / self.zoom, py0 / self.zoom, px1 / self.zoom, py1 / self.zoom)
         # 防越界
         r0 = page.rect
@@ -259,248 +627,127 @@ class PdfSvgGUI:
         if not self.doc:
             messagebox.showinfo("提示", "请先打开 PDF")
             return
+        import export_engine
         dpi = int(self.dpi_var.get() or 300)
+        try:
+            budget = int(float(self.mem_budget_var.get() or 0) * 1024 * 1024)
+        except Exception:
+            budget = 0
+        if budget <= 0:
+            budget = export_engine.DEFAULT_MEMORY_BUDGET
         page = self.doc[self.page_index]
         rect = self._canvas_to_page_rect()
-        mat = fitz.Matrix(dpi / 72.0, dpi / 72.0)
-        pix = page.get_pixmap(matrix=mat, clip=rect, alpha=True)
-        out = filedialog.asksaveasfilename(defaultextension=".png", filetypes=[("PNG", "*.png")], initialfile="extracted.png")
+        out = filedialog.asksaveasfilename(
+            defaultextension=".png",
+            filetypes=[("PNG", "*.png"), ("TIFF", "*.tif *.tiff")],
+            initialfile="extracted.png",
+        )
         if not out:
             return
-        img = Image.frombytes("RGBA", [pix.width, pix.height], pix.samples)
-        if self.remove_bg_var.get():
-            try:
-                img = self._remove_white_background(img)
-            except Exception:
-                pass
-        img.save(out, format="PNG")
-        messagebox.showinfo("完成", f"已导出 PNG: {out}")
 
-    def _remove_white_background(self, img: Image.Image, threshold: int = 250) -> Image.Image:
-        """
-        将近白像素（R、G、B 都 >= threshold）透明化，并与原 Alpha 叠乘。
-        """
-        img = img.convert("RGBA")
-        r, g, b, a = img.split()
-        mask_r = r.point(lambda v: 255 if v >= threshold else 0)
-        mask_g = g.point(lambda v: 255 if v >= threshold else 0)
-        mask_b = b.point(lambda v: 255 if v >= threshold else 0)
-        white_mask = ImageChops.multiply(mask_r, ImageChops.multiply(mask_g, mask_b))
-        alpha_from_white = ImageOps.invert(white_mask)  # 白色->0，非白->255
-        new_alpha = ImageChops.multiply(a, alpha_from_white)
-        img.putalpha(new_alpha)
-        return img
+        def progress(done_rows, total_rows):
+            self.status_var.set(f"正在渲染 PNG: {done_rows}/{total_rows} 行")
+            self.root.update_idletasks()
+
+        # 按条带渲染并流式写出，峰值内存受 budget 限制
+        try:
+            w, h = export_engine.render_png_strips(
+                page, rect, dpi, out,
+                alpha=True,
+                remove_bg=self.remove_bg_var.get(),
+                memory_budget=budget,
+                progress=progress,
+            )
+        except Exception as e:
+            self.status_var.set("就绪")
+            messagebox.showerror("导出失败", f"渲染 PNG 时出错: {e}")
+            return
+        self.status_var.set(f"已导出 {w}x{h}")
+        messagebox.showinfo("完成", f"已导出图片: {out}")
 
     def export_svg(self):
         if not self.doc:
             messagebox.showinfo("提示", "请先打开 PDF")
             return
-        page = self.doc[self.page_index]
+        import export_engine
         rect = self._canvas_to_page_rect()
 
-        # 通过将选区作为 clip 插入到一张新页面来实现严格裁剪
+        # 通过将选区作为 clip 插入到一张新页面来实现严格裁剪；纯图片选区改为引用外部图片
         try:
-            tmp_doc = fitz.open()
-            new_page = tmp_doc.new_page(width=rect.width, height=rect.height)
-            # 将源 PDF 页的选定区域显示到新页上（坐标原点对齐到 (0,0)）
-            new_page.show_pdf_page(new_page.rect, self.doc, self.page_index, clip=rect)
-
-            # 生成新页的 SVG（其尺寸与选区一致）
-            svg = new_page.get_svg_image()
-            # 可选：去除白底背景（仅移除覆盖全画布的白色矩形），保持其它元素
-            if self.remove_bg_var.get():
-                try:
-                    svg = self._remove_white_background_in_svg(svg, (float(rect.width), float(rect.height)))
-                except Exception:
-                    pass
+            svg, asset = export_engine.build_svg(self.doc, self.page_index, rect, remove_bg=self.remove_bg_var.get())
         except Exception as e:
             messagebox.showerror("导出失败", f"生成裁剪 SVG 时出错: {e}")
             return
-        finally:
-            try:
-                tmp_doc.close()
-            except Exception:
-                pass
 
-        # 缓存 SVG 及其尺寸，便于后续批量导出
-        self.last_svg = svg
+        # 缓存 SVG 及其尺寸，便于后续批量导出（引用外部图片的 SVG 不缓存，批量导出直接裁剪原图）
+        self.last_svg = svg if asset is None else None
         self.last_svg_size = (int(rect.width), int(rect.height))
         self.last_rect = rect
 
         out = filedialog.asksaveasfilename(defaultextension=".svg", filetypes=[("SVG", "*.svg")], initialfile="extracted.svg")
         if not out:
             return
-        Path(out).write_text(svg, encoding="utf-8")
+        if asset is not None:
+            name, data = asset
+            export_engine.write_asset(Path(out).parent / name, data)
+        if self.svg_assets_var.get():
+            # 单个 SVG 无可共享字形的其它文件，只外置图片，字形保留内嵌
+            with export_engine.SvgAssetStore(Path(out).parent, glyphs=False) as assets:
+                assets.add(out, svg)
+        else:
+            Path(out).write_text(svg, encoding="utf-8")
         try:
             self.last_svg_name = Path(out).stem or "extracted"
         except Exception:
             self.last_svg_name = "extracted"
         messagebox.showinfo("完成", f"已导出 SVG: {out}")
 
-    def _remove_white_background_in_svg(self, svg: str, size: tuple) -> str:
+    def save_selection_to_job(self):
         """
-        移除/透明化覆盖整张画布的白色背景：
-        - 处理 <rect>/<polygon>/<path> 中的白底图形
-        - 白色判断：white/#fff/#ffffff/#fefefe 等近白、rgb(>=250,>=250,>=250)
-        - 尺寸判断：接近画布尺寸或占比 >= 95%
-        若解析失败，回退到更强的正则删除常见白底元素。
+        将当前选区（页面坐标）及导出选项追加到批量作业文件（JSON/YAML），文件已存在时追加而非覆盖。
         """
-        def _parse_float(val: str) -> float:
-            try:
-                m = re.search(r"[-+]?[0-9]*\.?[0-9]+", str(val))
-                return float(m.group(0)) if m else 0.0
-            except Exception:
-                return 0.0
-
-        def _hex_to_rgb(hexstr: str):
-            h = hexstr.lstrip('#')
-            if len(h) == 3:
-                h = ''.join(ch*2 for ch in h)
-            if len(h) != 6:
-                return None
+        if not self.doc:
+            messagebox.showinfo("提示", "请先打开 PDF")
+            return
+        import batch_job
+        rect = self._canvas_to_page_rect()
+        out = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("JSON", "*.json"), ("YAML", "*.yaml *.yml")],
+            initialfile="job.json",
+            confirmoverwrite=False,
+        )
+        if not out:
+            return
+        sizes = [s for s, v in self.size_vars.items() if v.get()]
+        sraw = (self.custom_sizes_var.get() or "").strip().replace("，", ",")
+        for part in sraw.split(","):
             try:
-                return tuple(int(h[i:i+2], 16) for i in (0, 2, 4))
+                val = int(part.strip())
+                if val > 0:
+                    sizes.append(val)
             except Exception:
-                return None
-
-        def _parse_rgb(fill: str):
-            f = fill.strip().lower()
-            m = re.match(r"rgba?\(\s*([\d.]+)\s*,\s*([\d.]+)\s*,\s*([\d.]+)\s*(?:,\s*[\d.]+\s*)?\)", f)
-            if m:
-                vals = []
-                for g in m.groups()[:3]:
-                    if '%' in g:
-                        try:
-                            vals.append(int(round(float(g.strip('%')) * 2.55)))
-                        except Exception:
-                            vals.append(255)
-                    else:
-                        try:
-                            vals.append(int(round(float(g))))
-                        except Exception:
-                            vals.append(255)
-                return tuple(vals)
-            return None
-
-        def _is_white(fill: str) -> bool:
-            if not fill:
-                return False
-            f = fill.strip().lower().replace(" ", "")
-            if f == "white":
-                return True
-            if f.startswith('#'):
-                rgb = _hex_to_rgb(f)
-                if rgb:
-                    return all(c >= 250 for c in rgb)
-                return False
-            rgb = _parse_rgb(f)
-            if rgb:
-                return all(c >= 250 for c in rgb)
-            return False
-
-        def _ensure_transparent(child, style: str):
-            # 透明化而不是删除，避免影响布局
-            child.attrib["fill"] = "none"
-            styles = {}
-            if style:
-                for part in style.split(";"):
-                    if ":" in part:
-                        k, v = part.split(":", 1)
-                        styles[k.strip().lower()] = v.strip()
-            styles.pop("fill", None)
-            styles["fill"] = "none"
-            styles["fill-opacity"] = "0"
-            child.attrib["style"] = ";".join(f"{k}:{v}" for k, v in styles.items())
-
-        try:
-            root = ET.fromstring(svg)
-            canvas_w, canvas_h = size
-            tol = max(1.0, 0.02 * max(canvas_w, canvas_h))  # 2% 容差
-            min_ratio = 0.95
-            # 遍历候选元素，找到符合条件者并透明化
-            removed = False
-            for parent in root.iter():
-                for child in list(parent):
-                    tag = child.tag
-                    if isinstance(tag, str) and (tag.endswith("rect") or tag.endswith("polygon") or tag.endswith("path")):
-                        fill = child.attrib.get("fill")
-                        style = child.attrib.get("style", "")
-                        # 从 style 中提取 fill
-                        if not fill and style:
-                            for part in style.split(";"):
-                                if ":" in part:
-                                    k, v = part.split(":", 1)
-                                    if k.strip().lower() == "fill":
-                                        fill = v.strip()
-                                        break
-                        if not _is_white(fill):
-                            continue
-                        # stroke 检查：若存在描边，减少误伤
-                        stroke = child.attrib.get("stroke") or ""
-                        stroke_in_style = False
-                        if style:
-                            for part in style.split(";"):
-                                if ":" in part:
-                                    k, v = part.split(":", 1)
-                                    if k.strip().lower() == "stroke" and v.strip().lower() not in {"none", ""}:
-                                        stroke_in_style = True
-                                        break
-                        if stroke and stroke.lower() not in {"none", ""}:
-                            continue
-                        if stroke_in_style:
-                            continue
-
-                        fits_canvas = False
-                        if tag.endswith("rect"):
-                            w = _parse_float(child.attrib.get("width", canvas_w))
-                            h = _parse_float(child.attrib.get("height", canvas_h))
-                            x = _parse_float(child.attrib.get("x", 0))
-                            y = _parse_float(child.attrib.get("y", 0))
-                            if (abs(x) <= tol and abs(y) <= tol) and (w >= min_ratio * canvas_w and h >= min_ratio * canvas_h):
-                                fits_canvas = True
-                        elif tag.endswith("polygon"):
-                            pts = child.attrib.get("points", "")
-                            nums = re.findall(r"[-+]?\d*\.?\d+(?:e[-+]?\d+)?", pts)
-                            coords = [float(n) for n in nums]
-                            if len(coords) >= 8:
-                                xs = coords[0::2]
-                                ys = coords[1::2]
-                                minx, maxx = min(xs), max(xs)
-                                miny, maxy = min(ys), max(ys)
-                                if abs(minx) <= tol and abs(miny) <= tol and (maxx >= min_ratio * canvas_w) and (maxy >= min_ratio * canvas_h):
-                                    fits_canvas = True
-                        elif tag.endswith("path"):
-                            d = child.attrib.get("d", "")
-                            nums = re.findall(r"[-+]?\d*\.?\d+(?:e[-+]?\d+)?", d)
-                            coords = [float(n) for n in nums]
-                            if len(coords) >= 8:
-                                xs = coords[0::2]
-                                ys = coords[1::2]
-                                minx, maxx = min(xs), max(xs)
-                                miny, maxy = min(ys), max(ys)
-                                if abs(minx) <= tol and abs(miny) <= tol and (maxx >= min_ratio * canvas_w) and (maxy >= min_ratio * canvas_h):
-                                    fits_canvas = True
-
-                        if fits_canvas:
-                            _ensure_transparent(child, style)
-                            removed = True
-            if removed:
-                return ET.tostring(root, encoding="unicode")
-        except Exception:
-            pass
-
-        # 回退：正则替换首个匹配的白底背景（rect/path/polygon）
+                pass
+        options = {
+            "sizes": sorted(set(sizes)),
+            "formats": ["SVG"] + [fmt for fmt, v in self.export_formats.items() if v.get()],
+            "remove_bg": bool(self.remove_bg_var.get()),
+        }
         try:
-            color_pat = r"(?:#(?:fff|ffffff|fefefe)|white|rgb\(\s*25[0-9]\s*,\s*25[0-9]\s*,\s*25[0-9]\s*\))"
-            style_pat = rf"style\s*=\s*\"[^\"]*fill\s*:\s*{color_pat}[^\"]*\""
-            fill_pat = rf"fill\s*=\s*\"{color_pat}\""
-            rect_pat = rf"<rect[^>]*?(?:{fill_pat}|{style_pat})[^>]*?>"
-            poly_pat = rf"<polygon[^>]*?(?:{fill_pat}|{style_pat})[^>]*?>"
-            path_pat = rf"<path[^>]*?(?:{fill_pat}|{style_pat})[^>]*?>"
-            pattern = rf"({rect_pat}|{poly_pat}|{path_pat})"
-            return re.sub(pattern, "", svg, count=1, flags=re.IGNORECASE)
-        except Exception:
-            return svg
+            job = batch_job.load_job(out) if Path(out).exists() else {"output": "output", "documents": []}
+            # 文档路径尽量相对作业文件保存，便于整体移动
+            pdf_path = Path(self.doc.name).resolve()
+            try:
+                pdf_ref = str(pdf_path.relative_to(Path(out).resolve().parent))
+            except ValueError:
+                pdf_ref = str(pdf_path)
+            batch_job.add_region(job, pdf_ref, self.page_index + 1, (rect.x0, rect.y0, rect.x1, rect.y1), options)
+            batch_job.save_job(out, job)
+        except Exception as e:
+            messagebox.showerror("保存失败", f"写入作业文件时出错: {e}")
+            return
+        count = sum(len(d.get("regions") or []) for d in job["documents"])
+        self.status_var.set(f"已保存选区到作业: {Path(out).name}（共 {count} 个选区）")
 
     def batch_export_images(self):
         """
@@ -537,8 +784,11 @@ class PdfSvgGUI:
         ttk.Label(custom_frame, text="自定义尺寸（逗号分隔，如 20,40,80）").pack(side=tk.LEFT)
         ttk.Entry(custom_frame, textvariable=self.custom_sizes_var, width=24).pack(side=tk.LEFT, padx=8)
 
+        ttk.Checkbutton(frm, text="合并为图集（PNG/WEBP 图集页 + JSON/CSS 坐标表）", variable=self.atlas_var).grid(
+            row=5, column=0, sticky="w", pady=(8,0))
+
         btn_frame = ttk.Frame(frm)
-        btn_frame.grid(row=5, column=0, sticky="e", pady=(12,0))
+        btn_frame.grid(row=6, column=0, sticky="e", pady=(12,0))
         ttk.Button(btn_frame, text="开始导出", command=lambda: self._on_export_dialog_confirm(dlg)).pack(side=tk.RIGHT)
         ttk.Button(btn_frame, text="取消", command=dlg.destroy).pack(side=tk.RIGHT, padx=8)
 
@@ -600,33 +850,17 @@ class PdfSvgGUI:
                 self.root.update_idletasks()
             except Exception:
                 pass
-        # 确保有 SVG 可用：若无缓存则从当前选区生成一次
+        import export_engine
+        # 无缓存 SVG 时使用当前选区；SVG 由引擎按需生成（纯图片选区直接裁剪原图，无需 SVG）
         if not self.last_svg:
             if not self.doc:
                 messagebox.showinfo("提示", "请先打开 PDF")
                 prog.destroy()
                 return
-            try:
-                page = self.doc[self.page_index]
-                rect = self._canvas_to_page_rect()
-                tmp_doc = fitz.open()
-                new_page = tmp_doc.new_page(width=rect.width, height=rect.height)
-                new_page.show_pdf_page(new_page.rect, self.doc, self.page_index, clip=rect)
-                svg = new_page.get_svg_image()
-                try:
-                    tmp_doc.close()
-                except Exception:
-                    pass
-                self.last_svg = svg
-                self.last_svg_size = (int(rect.width), int(rect.height))
-                self.last_rect = rect
-            except Exception as e:
-                messagebox.showerror("错误", f"生成 SVG 失败: {e}")
-                prog.destroy()
-                return
+            rect = self._canvas_to_page_rect()
+            self.last_svg_size = (int(rect.width), int(rect.height))
+            self.last_rect = rect
 
-        svg = self.last_svg
-        orig_w, orig_h = self.last_svg_size
         # 选择输出文件夹
         out_dir = filedialog.askdirectory(title="选择导出文件夹")
         if not out_dir:
@@ -637,12 +871,7 @@ class PdfSvgGUI:
             return
 
         # CairoSVG 可选：若不可用，回退到 PyMuPDF 渲染
-        cairo_available = True
-        try:
-            import cairosvg
-        except Exception as e:
-            cairo_available = False
-            log(f"CairoSVG 不可用，将使用 PyMuPDF 回退渲染。错误: {e}")
+        cairosvg = export_engine.load_cairosvg(log)
 
         # 收集用户勾选的尺寸与格式
         sizes = [s for s, v in self.size_vars.items() if v.get()]
@@ -671,144 +900,35 @@ class PdfSvgGUI:
             return
 
         base = self.last_svg_name or "extracted"
-        out_path = Path(out_dir)
-
-        exported = []
-        total = len(sizes) * len(formats)
-        done = 0
-        prog_bar['maximum'] = max(1, total)
+        atlas = None
+        if self.atlas_var.get():
+            atlas = export_engine.AtlasBuilder(out_dir, name=f"{base}_atlas", formats=formats)
+        prog_bar['maximum'] = max(1, len(sizes) if atlas is not None else len(sizes) * len(formats))
         self.status_var.set("开始导出...")
-        for target in sizes:
-            # 保持原始宽高比，按较长边为 target 缩放
-            if orig_w <= 0 or orig_h <= 0:
-                w = h = target
-            elif orig_w >= orig_h:
-                w = target
-                h = max(1, int(round(target * orig_h / orig_w)))
-            else:
-                h = target
-                w = max(1, int(round(target * orig_w / orig_h)))
 
-            try:
-                if cairo_available:
-                    png_bytes = cairosvg.svg2png(bytestring=svg.encode("utf-8"), output_width=w, output_height=h)
-                    img = Image.open(io.BytesIO(png_bytes))
-                    if img.size != (w, h):
-                        img = img.resize((w, h), Image.LANCZOS)
-                else:
-                    # 回退：使用 PyMuPDF 基于原始 PDF 选区进行渲染，再按目标尺寸缩放
-                    rect = self.last_rect or self._canvas_to_page_rect()
-                    tmp_doc = fitz.open()
-                    new_page = tmp_doc.new_page(width=rect.width, height=rect.height)
-                    new_page.show_pdf_page(new_page.rect, self.doc, self.page_index, clip=rect)
-                    scale_x = w / rect.width
-                    scale_y = h / rect.height
-                    mat = fitz.Matrix(scale_x, scale_y)
-                    pix = new_page.get_pixmap(matrix=mat, alpha=True)
-                    img = Image.frombytes("RGBA", [pix.width, pix.height], pix.samples)
-                    try:
-                        tmp_doc.close()
-                    except Exception:
-                        pass
-                # 去除白底（可选），然后按目标尺寸确保尺寸一致
-                if self.remove_bg_var.get():
-                    try:
-                        img = self._remove_white_background(img)
-                    except Exception:
-                        pass
-                if img.size != (w, h):
-                    img = img.resize((w, h), Image.LANCZOS)
-                if "PNG" in formats:
-                    png_path = out_path / f"{base}_{w}x{h}.png"
-                    buf = io.BytesIO()
-                    img.save(buf, format="PNG")
-                    png_path.write_bytes(buf.getvalue())
-                    done += 1
-                    prog_bar['value'] = done
-                    log(f"PNG: {png_path.name}")
-                    exported.append(str(png_path))
-                if "WEBP" in formats:
-                    webp_path = out_path / f"{base}_{w}x{h}.webp"
-                    try:
-                        img.save(webp_path, format="WEBP", lossless=True)
-                    except Exception:
-                        img.save(webp_path, format="WEBP")
-                    done += 1
-                    prog_bar['value'] = done
-                    log(f"WEBP: {webp_path.name}")
-                    exported.append(str(webp_path))
-                if "JPG" in formats:
-                    jpg_path = out_path / f"{base}_{w}x{h}.jpg"
-                    rgb = Image.new("RGB", (w, h), (255, 255, 255))
-                    if img.mode in ("RGBA", "LA"):
-                        alpha = img.split()[-1]
-                        rgb.paste(img.convert("RGB"), mask=alpha)
-                    else:
-                        rgb.paste(img)
-                    rgb.save(jpg_path, format="JPEG", quality=95)
-                    done += 1
-                    prog_bar['value'] = done
-                    log(f"JPG: {jpg_path.name}")
-                    exported.append(str(jpg_path))
-                if "ICO" in formats:
-                    # ICO 通常支持最大 256x256，超出尺寸跳过
-                    if w > 256 or h > 256:
-                        log(f"跳过 ICO 尺寸 {w}x{h}（ICO 最大为 256）")
-                    else:
-                        ico_path = out_path / f"{base}_{w}x{h}.ico"
-                        try:
-                            img_for_ico = img
-                            if img_for_ico.mode not in ("RGBA", "RGB", "P"):
-                                img_for_ico = img_for_ico.convert("RGBA")
-                            # 去除白底（可选）
-                            if self.remove_bg_var.get():
-                                try:
-                                    img_for_ico = self._remove_white_background(img_for_ico)
-                                except Exception:
-                                    pass
-                            # 明确写入目标尺寸
-                            img_for_ico.save(ico_path, format="ICO", sizes=[(w, h)])
-                            done += 1
-                            prog_bar['value'] = done
-                            log(f"ICO: {ico_path.name}")
-                            exported.append(str(ico_path))
-                        except Exception as e:
-                            log(f"ICO 导出失败 {w}x{h}: {e}")
-            except Exception as e:
-                log(f"失败: 尺寸 {target} 处理失败: {e}")
-                messagebox.showerror("导出失败", f"尺寸 {target} 处理失败: {e}")
-                break
+        def progress(done: int, total: int):
+            prog_bar['value'] = done
 
-        # 原始尺寸的 PNG 也导出一份（若可用）
-        if orig_w > 0 and orig_h > 0:
+        def on_error(target: int, e: Exception):
+            messagebox.showerror("导出失败", f"尺寸 {target} 处理失败: {e}")
+
+        exported = export_engine.export_size_ladder(
+            self.doc, self.page_index, self.last_rect or self._canvas_to_page_rect(),
+            sizes, formats, out_dir,
+            base=base,
+            remove_bg=self.remove_bg_var.get(),
+            svg=self.last_svg,
+            cairosvg=cairosvg,
+            log=log,
+            progress=progress,
+            on_error=on_error,
+            atlas=atlas,
+        )
+        if atlas is not None:
             try:
-                if cairo_available:
-                    png_bytes = cairosvg.svg2png(bytestring=svg.encode("utf-8"), output_width=orig_w, output_height=orig_h)
-                    img = Image.open(io.BytesIO(png_bytes))
-                else:
-                    rect = self.last_rect or self._canvas_to_page_rect()
-                    tmp_doc = fitz.open()
-                    new_page = tmp_doc.new_page(width=rect.width, height=rect.height)
-                    new_page.show_pdf_page(new_page.rect, self.doc, self.page_index, clip=rect)
-                    pix = new_page.get_pixmap(alpha=True)
-                    img = Image.frombytes("RGBA", [pix.width, pix.height], pix.samples)
-                    try:
-                        tmp_doc.close()
-                    except Exception:
-                        pass
-                if self.remove_bg_var.get():
-                    try:
-                        img = self._remove_white_background(img)
-                    except Exception:
-                        pass
-                orig_png = out_path / f"{base}_{orig_w}x{orig_h}.png"
-                img.save(orig_png, format="PNG")
-                exported.append(str(orig_png))
-                done += 1
-                prog_bar['value'] = done
-                log(f"原始尺寸 PNG: {orig_png.name}")
-            except Exception:
-                pass
+                exported += atlas.close(log=log)
+            except Exception as e:
+                messagebox.showerror("导出失败", f"生成图集失败: {e}")
 
         # 完成
         self.status_var.set(f"导出完成，文件数: {len(exported)}")
@@ -817,12 +937,164 @@ class PdfSvgGUI:
         ttk.Button(prog_frame, text="关闭", command=prog.destroy).pack(anchor="e", pady=6)
 
 
+def _thumb_worker(path: str, requests, results):
+    """
+    缩略图进程：独立打开文档，按请求的页码渲染并以 PPM 字节返回；收到 None 时退出。
+    打开失败时返回 (-1, None)。
+    """
+    import fitz  # PyMuPDF
+    try:
+        doc = fitz.open(path)
+    except Exception:
+        results.put((-1, None))
+        return
+    while True:
+        index = requests.get()
+        if index is None:
+            break
+        try:
+            page = doc[index]
+            s = min(THUMB_W / max(1.0, page.rect.width), THUMB_H / max(1.0, page.rect.height))
+            pix = page.get_pixmap(matrix=fitz.Matrix(s, s), alpha=False)
+            results.put((index, pix.tobytes("ppm")))
+        except Exception:
+            results.put((index, None))
+    doc.close()
+
+
+def _parent_executable():
+    """
+    返回父进程的可执行文件路径，无法获取时返回 None。
+    """
+    import os
+    try:
+        import psutil
+        return psutil.Process(os.getppid()).exe()
+    except Exception:
+        pass
+    try:
+        return os.readlink(f"/proc/{os.getppid()}/exe")
+    except OSError:
+        return None
+
+
+def _is_onefile() -> bool:
+    """
+    PyInstaller 单文件模式：程序被解包到临时目录 _MEIxxxxxx 后，由运行同一可执行文件的子进程执行。
+    （PyInstaller 6 的目录模式中 _MEIPASS 为 <dist>/pdf_svg_gui/_internal，不属于此情况。）
+    """
+    meipass = getattr(sys, "_MEIPASS", None)
+    if not (getattr(sys, "frozen", False) and meipass and Path(meipass).name.startswith("_MEI")):
+        return False
+    parent = _parent_executable()
+    if parent is None:
+        return True
+    try:
+        return Path(parent).resolve() == Path(sys.executable).resolve()
+    except OSError:
+        return False
+
+
+def _process_start_time(pid: int):
+    """
+    返回进程的创建时间（Unix 时间戳，秒），无法获取时返回 None。
+    优先使用 psutil（若已安装），否则 Windows 用 GetProcessTimes、Linux 读 /proc。
+    """
+    try:
+        import psutil
+        return psutil.Process(pid).create_time()
+    except Exception:
+        pass
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+            kernel32 = ctypes.windll.kernel32
+            handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+            if not handle:
+                return None
+            try:
+                times = [wintypes.FILETIME() for _ in range(4)]
+                if not kernel32.GetProcessTimes(handle, *[ctypes.byref(t) for t in times]):
+                    return None
+                ft = (times[0].dwHighDateTime << 32) | times[0].dwLowDateTime
+                # FILETIME：自 1601-01-01 起的 100ns 计数
+                return ft / 1e7 - 11644473600.0
+            finally:
+                kernel32.CloseHandle(handle)
+        if sys.platform.startswith("linux"):
+            import os
+            with open(f"/proc/{pid}/stat", "rb") as f:
+                # 进程名可能含空格，从最后一个 ")" 之后开始计字段
+                fields = f.read().rsplit(b")", 1)[1].split()
+            ticks = int(fields[19])
+            with open("/proc/stat", "rb") as f:
+                btime = next(int(line.split()[1]) for line in f if line.startswith(b"btime"))
+            return btime + ticks / os.sysconf("SC_CLK_TCK")
+    except Exception:
+        return None
+    return None
+
+
+def _report_startup(root: tk.Tk, app: "PdfSvgGUI", t_built: float, log_path: str = None):
+    """
+    首次映射窗口时输出启动耗时：进程创建到 Python 开始执行（含单文件解包、解释器启动）/
+    模块导入 / 界面构建 / 窗口出现。单文件模式下从负责解包的父进程创建时算起。
+    """
+    import os
+    t_shown = time.perf_counter()
+    onefile = _is_onefile()
+    start = _process_start_time(os.getppid() if onefile else os.getpid())
+    pre = None
+    if start is not None:
+        # 进程创建时间的精度有限（Linux 为时钟节拍），避免出现负值
+        pre = max(0.0, _T0_WALL - start)
+    total = (t_shown - _T0) + (pre or 0.0)
+    if pre is None:
+        pre_text = "进程启动阶段未知，"
+    else:
+        pre_text = f"{'解包及' if onefile else ''}解释器启动 {pre * 1000:.0f} ms，"
+    msg = (
+        f"启动耗时 {total * 1000:.0f} ms"
+        f"（{pre_text}"
+        f"导入 {(_T_IMPORTS - _T0) * 1000:.0f} ms，"
+        f"构建界面 {(t_built - _T_IMPORTS) * 1000:.0f} ms，"
+        f"窗口出现 {(t_shown - t_built) * 1000:.0f} ms）"
+    )
+    app.status_var.set(msg)
+    if log_path:
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write(msg + "\n")
+    elif sys.stdout is not None:
+        print(msg)
+
+
 def main():
+    if getattr(sys, "frozen", False):
+        # 打包程序中缩略图子进程由同一可执行文件启动，需在解析参数之前分流
+        import multiprocessing
+        multiprocessing.freeze_support()
+    import argparse
+    ap = argparse.ArgumentParser(description="PDF 交互式提取 SVG/PNG 工具")
+    ap.add_argument("--startup-time", nargs="?", const="", metavar="日志文件",
+                    help="测量启动耗时：窗口出现后输出（或追加到日志文件）并退出")
+    args = ap.parse_args()
+
     root = tk.Tk()
     app = PdfSvgGUI(root)
     root.geometry("1200x800")
+    if args.startup_time is not None:
+        t_built = time.perf_counter()
+
+        def on_map(e):
+            if e.widget is root:
+                root.unbind("<Map>")
+                _report_startup(root, app, t_built, args.startup_time or None)
+                root.after(200, root.destroy)
+
+        root.bind("<Map>", on_map)
     root.mainloop()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
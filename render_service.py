@@ -0,0 +1,295 @@
+"""
+本地 HTTP 渲染服务（asyncio）：供其它服务直接请求裁剪导出，免去每个任务的解释器启动、
+fitz.open 与 CairoSVG 导入开销。
+
+- 渲染在进程池中执行；每个工作进程维护按 (路径, 修改时间) 键控的文档句柄 LRU 缓存，
+  CairoSVG 在工作进程启动时预先导入；
+- 同一路径的请求固定分派到同一工作进程，以命中该进程中已打开的文档。
+
+用法：
+  python render_service.py [--host 127.0.0.1] [--port 8765] [--workers 2] [--cache 8] [--root 目录]
+
+接口（请求体均为 JSON，页码从 1 开始，rect 为页面坐标 [x0, y0, x1, y1]，缺省为整页）：
+  GET  /health
+  POST /svg     {"path", "page", "rect", "remove_bg"}                         -> image/svg+xml
+  POST /png     {"path", "page", "rect", "dpi", "remove_bg", "format"}        -> image/png 或 image/tiff
+  POST /ladder  {"path", "page", "rect", "sizes", "formats", "remove_bg",
+                 "out_dir", "base"}                                            -> {"files": [...]}
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import logging
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import fitz  # PyMuPDF
+
+import export_engine
+
+
+log = logging.getLogger("render_service")
+
+# 单个请求体上限
+MAX_BODY = 1024 * 1024
+DEFAULT_DOC_CACHE_SIZE = 8
+
+# ---------- 工作进程内状态 ----------
+
+_doc_cache = OrderedDict()  # (路径, mtime) -> fitz.Document
+_doc_cache_size = DEFAULT_DOC_CACHE_SIZE
+_cairosvg = None
+
+
+def _init_worker(cache_size: int):
+    global _doc_cache_size, _cairosvg
+    _doc_cache_size = max(1, cache_size)
+    _cairosvg = export_engine.load_cairosvg()
+
+
+def _get_doc(path: str):
+    """
+    返回已打开的文档句柄；文件被修改（mtime 变化）后旧句柄作废，超出容量按 LRU 关闭。
+    """
+    mtime = os.stat(path).st_mtime_ns
+    key = (path, mtime)
+    doc = _doc_cache.pop(key, None)
+    if doc is None:
+        for stale in [k for k in _doc_cache if k[0] == path]:
+            _doc_cache.pop(stale).close()
+        doc = fitz.open(path)
+    _doc_cache[key] = doc
+    while len(_doc_cache) > _doc_cache_size:
+        _, old = _doc_cache.popitem(last=False)
+        old.close()
+    return doc
+
+
+def _page_and_rect(doc, params: dict):
+    pno = int(params.get("page", 1)) - 1
+    if not 0 <= pno < doc.page_count:
+        raise ValueError(f"页码超出范围: {pno + 1}")
+    page = doc[pno]
+    rect = page.rect
+    if params.get("rect"):
+        rect = fitz.Rect(params["rect"]) & page.rect
+        if rect.is_empty:
+            raise ValueError("选区为空")
+    return pno, page, rect
+
+
+def _job_svg(path: str, params: dict) -> bytes:
+    doc = _get_doc(path)
+    pno, _, rect = _page_and_rect(doc, params)
+    return export_engine.crop_svg(doc, pno, rect, remove_bg=bool(params.get("remove_bg"))).encode("utf-8")
+
+
+def _job_png(path: str, params: dict) -> bytes:
+    doc = _get_doc(path)
+    _, page, rect = _page_and_rect(doc, params)
+    buf = io.BytesIO()
+    export_engine.render_png_strips(
+        page, rect, int(params.get("dpi", 300)), buf,
+        remove_bg=bool(params.get("remove_bg")),
+        fmt=str(params.get("format", "PNG")).upper(),
+    )
+    return buf.getvalue()
+
+
+def _job_ladder(path: str, params: dict) -> dict:
+    doc = _get_doc(path)
+    pno, _, rect = _page_and_rect(doc, params)
+    out_dir = Path(params["out_dir"])
+    out_dir.mkdir(parents=True, exist_ok=True)
+    sizes = sorted({int(s) for s in params.get("sizes", []) if int(s) > 0})
+    formats = [str(f).upper() for f in params.get("formats", ["PNG"])]
+    remove_bg = bool(params.get("remove_bg"))
+    errors = []
+    files = export_engine.export_size_ladder(
+        doc, pno, rect, sizes, formats, out_dir,
+        base=params.get("base") or Path(path).stem,
+        remove_bg=remove_bg,
+        cairosvg=_cairosvg,
+        on_error=lambda target, e: errors.append(f"{target}: {e}"),
+    )
+    return {"files": [str(f) for f in files], "errors": errors}
+
+
+# ---------- HTTP 服务 ----------
+
+ROUTES = {
+    "/svg": (_job_svg, "image/svg+xml"),
+    "/png": (_job_png, None),
+    "/ladder": (_job_ladder, "application/json"),
+}
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found",
+               405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class RenderService:
+    def __init__(self, workers: int = 2, cache_size: int = DEFAULT_DOC_CACHE_SIZE, root=None):
+        # 每个单进程执行器对应一个工作进程，按路径固定分派以提高文档缓存命中率
+        self.cache_size = cache_size
+        self.pools = [self._new_pool() for _ in range(max(1, workers))]
+        self.root = Path(root).resolve() if root else None
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=1, initializer=_init_worker, initargs=(self.cache_size,))
+
+    def _within_root(self, path) -> Path:
+        p = Path(path).resolve()
+        if self.root is not None and self.root != p and self.root not in p.parents:
+            raise HttpError(403, f"路径不在允许的目录下: {p}")
+        return p
+
+    def _resolve(self, path) -> str:
+        if not path:
+            raise HttpError(400, "缺少 path")
+        p = self._within_root(path)
+        if not p.is_file():
+            raise HttpError(404, f"文件不存在: {p}")
+        return str(p)
+
+    async def dispatch(self, method: str, target: str, body: bytes):
+        if target == "/health":
+            return 200, "application/json", b'{"status": "ok"}'
+        if target not in ROUTES:
+            raise HttpError(404, f"未知接口: {target}")
+        if method != "POST":
+            raise HttpError(405, "仅支持 POST")
+        try:
+            params = json.loads(body or b"{}")
+        except ValueError as e:
+            raise HttpError(400, f"请求体不是合法 JSON: {e}")
+        if not isinstance(params, dict):
+            raise HttpError(400, "请求体必须是 JSON 对象")
+        path = self._resolve(params.get("path"))
+        if target == "/ladder":
+            # 输出目录同样受 --root 限制
+            if not params.get("out_dir"):
+                raise HttpError(400, "缺少 out_dir")
+            params["out_dir"] = str(self._within_root(params["out_dir"]))
+        job, ctype = ROUTES[target]
+        index = hash(path) % len(self.pools)
+        pool = self.pools[index]
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(pool, job, path, params)
+        except (ValueError, KeyError) as e:
+            raise HttpError(400, str(e))
+        except BrokenProcessPool:
+            # 工作进程崩溃（如 MuPDF 处理异常文件）：换上新的执行器，后续请求不受影响
+            if self.pools[index] is pool:
+                self.pools[index] = self._new_pool()
+                pool.shutdown(wait=False)
+                log.error("工作进程 %d 异常退出，已重新启动（请求: %s %s）", index, target, path)
+            raise HttpError(500, "工作进程异常退出")
+        if target == "/png":
+            ctype = "image/tiff" if str(params.get("format", "PNG")).upper() == "TIFF" else "image/png"
+        if isinstance(result, dict):
+            result = json.dumps(result, ensure_ascii=False).encode("utf-8")
+        return 200, ctype, result
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        处理一个连接，支持 HTTP/1.1 keep-alive。
+        """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    method, target, version = line.decode("latin-1").split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                try:
+                    try:
+                        length = int(headers.get("content-length") or 0)
+                        if length < 0:
+                            raise ValueError(length)
+                    except ValueError:
+                        # 无法确定请求体边界，响应后关闭连接
+                        keep_alive = False
+                        raise HttpError(400, "Content-Length 无效")
+                    if length > MAX_BODY:
+                        keep_alive = False
+                        raise HttpError(413, "请求体过大")
+                    body = await reader.readexactly(length) if length else b""
+                    status, ctype, payload = await self.dispatch(method, target.split("?", 1)[0], body)
+                except HttpError as e:
+                    status, ctype = e.status, "application/json"
+                    payload = json.dumps({"error": str(e)}, ensure_ascii=False).encode("utf-8")
+                except Exception as e:
+                    log.exception("处理请求失败: %s %s", method, target)
+                    status, ctype = 500, "application/json"
+                    payload = json.dumps({"error": str(e)}, ensure_ascii=False).encode("utf-8")
+                head = (
+                    f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                    f"Content-Type: {ctype}\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                )
+                writer.write(head.encode("latin-1") + payload)
+                await writer.drain()
+                log.info("%s %s -> %d (%d 字节)", method, target, status, len(payload))
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def shutdown(self):
+        for pool in self.pools:
+            pool.shutdown(wait=True)
+
+
+async def serve(host: str, port: int, service: RenderService):
+    server = await asyncio.start_server(service.handle, host, port)
+    log.info("渲染服务已启动: http://%s:%d", host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="本地 HTTP 渲染服务")
+    ap.add_argument("--host", default="127.0.0.1", help="监听地址（默认仅本机）")
+    ap.add_argument("--port", type=int, default=8765, help="监听端口")
+    ap.add_argument("--workers", type=int, default=2, help="渲染工作进程数")
+    ap.add_argument("--cache", type=int, default=DEFAULT_DOC_CACHE_SIZE, help="每个工作进程缓存的文档句柄数")
+    ap.add_argument("--root", help="仅允许访问该目录下的 PDF 与输出目录")
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    service = RenderService(workers=args.workers, cache_size=args.cache, root=args.root)
+    try:
+        asyncio.run(serve(args.host, args.port, service))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
@@ -0,0 +1,52 @@
+import io
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+import export_engine
+
+
+def _image_page(prefix: bytes = b"", suffix: bytes = b"", extgstate: str = None):
+    """
+    一页只含一张 300x300 红色图片（左上角对齐）的文档；prefix/suffix 包裹原内容流。
+    """
+    doc = fitz.open()
+    page = doc.new_page(width=300, height=300)
+    buf = io.BytesIO()
+    Image.new("RGB", (300, 300), (202, 30, 30)).save(buf, format="PNG")
+    page.insert_image(page.rect, stream=buf.getvalue())
+    doc = fitz.open("pdf", doc.tobytes())
+    page = doc[0]
+    xref = page.get_contents()[0]
+    content = doc.xref_stream(xref)
+    if extgstate:
+        res = doc.xref_get_key(page.xref, "Resources")
+        res_xref = int(res[1].split()[0]) if res[0] == "xref" else page.xref
+        key = "ExtGState" if res[0] == "xref" else "Resources/ExtGState"
+        doc.xref_set_key(res_xref, key, f"<</GSx {extgstate}>>")
+        prefix = b"/GSx gs " + prefix
+    doc.update_stream(xref, b"q " + prefix + content + suffix + b" Q")
+    return fitz.open("pdf", doc.tobytes())
+
+
+def test_plain_image_takes_fast_path():
+    doc = _image_page()
+    assert export_engine.find_image_source(doc[0], fitz.Rect(0, 0, 150, 150)) is not None
+
+
+def test_clipped_image_rejected_and_rendered_like_mupdf(tmp_path):
+    # 图片被裁到页面坐标 (100,100)-(200,200) 的方框内，(10,10) 处应为透明
+    doc = _image_page(prefix=b"100 100 100 100 re W n ")
+    page = doc[0]
+    rect = fitz.Rect(0, 0, 150, 150)
+    assert export_engine.find_image_source(page, rect) is None
+    out = tmp_path / "clip.png"
+    export_engine.render_png_strips(page, rect, 72, out)
+    with Image.open(out) as img:
+        assert img.convert("RGBA").getpixel((10, 10))[3] == 0
+        assert img.convert("RGBA").getpixel((120, 120))[3] == 255
+
+
+def test_transparent_graphics_state_rejected():
+    doc = _image_page(extgstate="<</ca 0.5/CA 0.5>>")
+    assert export_engine.find_image_source(doc[0], fitz.Rect(0, 0, 150, 150)) is None
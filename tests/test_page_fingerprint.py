@@ -0,0 +1,58 @@
+import io
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+import export_engine
+
+
+def _png(color):
+    buf = io.BytesIO()
+    Image.new("RGB", (20, 20), color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _doc_with_inherited_resources():
+    """
+    一页带图片的文档，页面的 /Resources 移到页面树根节点上（由页面继承）。
+    """
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_image(fitz.Rect(50, 50, 150, 150), stream=_png((200, 0, 0)))
+    doc = fitz.open("pdf", doc.tobytes())
+    page = doc[0]
+    resources = doc.xref_get_key(page.xref, "Resources")[1]
+    pages_xref = int(doc.xref_get_key(page.xref, "Parent")[1].split()[0])
+    doc.xref_set_key(pages_xref, "Resources", resources)
+    doc.xref_set_key(page.xref, "Resources", "null")
+    return fitz.open("pdf", doc.tobytes())
+
+
+def test_inherited_resources_content_changes_fingerprint():
+    doc = _doc_with_inherited_resources()
+    assert doc.xref_get_key(doc[0].xref, "Resources")[0] == "null"
+    before = export_engine.page_fingerprint(doc, 0)
+    xref = doc[0].get_images()[0][0]
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 20, 20), False)
+    pix.set_rect(pix.irect, (0, 0, 200))
+    doc.update_stream(xref, pix.samples, compress=True)
+    assert export_engine.page_fingerprint(doc, 0) != before
+
+
+def test_inherited_resources_stable_across_renumbering():
+    doc = _doc_with_inherited_resources()
+    before = export_engine.page_fingerprint(doc, 0)
+    resaved = fitz.open("pdf", doc.tobytes(garbage=4, deflate=True))
+    assert export_engine.page_fingerprint(resaved, 0) == before
+
+
+def test_linked_page_edit_does_not_change_fingerprint():
+    doc = fitz.open()
+    for _ in range(3):
+        doc.new_page()
+    doc[0].insert_link({"kind": fitz.LINK_GOTO, "from": fitz.Rect(10, 10, 100, 30), "page": 2})
+    doc = fitz.open("pdf", doc.tobytes())
+    before = export_engine.page_fingerprint(doc, 0)
+    doc[2].insert_text((50, 100), "edited")
+    doc = fitz.open("pdf", doc.tobytes())
+    assert export_engine.page_fingerprint(doc, 0) == before
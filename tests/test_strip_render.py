@@ -0,0 +1,62 @@
+import fitz  # PyMuPDF
+import pytest
+from PIL import Image
+
+import export_engine
+
+
+def _sample_page(stroked=False):
+    doc = fitz.open()
+    page = doc.new_page(width=200, height=150)
+    if stroked:
+        page.draw_circle((100, 75), 60, color=(0, 0, 1), fill=(1, 0.8, 0), width=3)
+        page.draw_line((0, 0), (200, 150), color=(1, 0, 0), width=1.5)
+    else:
+        page.draw_rect((30, 30, 170, 120), color=None, fill=(1, 0.8, 0))
+        page.draw_circle((100, 75), 40, color=None, fill=(0, 0.5, 1))
+    page.insert_text((20, 40), "Strip test", fontsize=18)
+    return doc
+
+
+def _render_both(tmp_path, doc, suffix):
+    page = doc[0]
+    rect = fitz.Rect(10, 5, 190, 140)
+    dpi = 150
+    out = tmp_path / f"strips{suffix}"
+    # 极小的预算使每个条带只有几行，覆盖多条带拼接
+    w, h = export_engine.render_png_strips(page, rect, dpi, out, memory_budget=4096)
+    mat = fitz.Matrix(dpi / 72.0, dpi / 72.0)
+    pix = page.get_pixmap(matrix=mat, clip=rect, alpha=True)
+    assert (w, h) == (pix.width, pix.height)
+    with Image.open(out) as img:
+        assert img.mode == "RGBA"
+        return img.tobytes(), pix.samples
+
+
+@pytest.mark.parametrize("suffix", [".png", ".tif"])
+def test_strips_match_one_shot_render(tmp_path, suffix):
+    strips, whole = _render_both(tmp_path, _sample_page(), suffix)
+    assert strips == whole
+
+
+@pytest.mark.parametrize("suffix", [".png", ".tif"])
+def test_stroked_strips_close_to_one_shot_render(tmp_path, suffix):
+    # 描边的抗锯齿随 clip 变化，只要求差异细微且稀少
+    strips, whole = _render_both(tmp_path, _sample_page(stroked=True), suffix)
+    assert len(strips) == len(whole)
+    diffs = [abs(a - b) for a, b in zip(strips, whole)]
+    assert max(diffs) <= 32
+    assert sum(diffs) / len(diffs) < 0.1
+
+
+def test_failed_render_removes_partial_file(tmp_path, monkeypatch):
+    doc = _sample_page()
+    out = tmp_path / "broken.png"
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("band failed")
+
+    monkeypatch.setattr(export_engine, "remove_white_background", fail)
+    with pytest.raises(RuntimeError):
+        export_engine.render_png_strips(doc[0], doc[0].rect, 72, out, remove_bg=True, memory_budget=4096)
+    assert not out.exists()
@@ -0,0 +1,42 @@
+import io
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+import export_engine
+
+
+def _text_and_image_svg():
+    doc = fitz.open()
+    page = doc.new_page(width=200, height=150)
+    page.insert_text((20, 40), "Glyphs", fontsize=18)
+    buf = io.BytesIO()
+    Image.new("RGB", (20, 20), (200, 10, 10)).save(buf, "PNG")
+    page.insert_image(fitz.Rect(100, 60, 180, 140), stream=buf.getvalue())
+    svg, asset = export_engine.build_svg(doc, 0, page.rect)
+    assert asset is None
+    return svg
+
+
+def test_shared_glyph_sheet(tmp_path):
+    svg = _text_and_image_svg()
+    with export_engine.SvgAssetStore(tmp_path) as assets:
+        assets.add(tmp_path / "a.svg", svg)
+        assets.add(tmp_path / "b.svg", svg)
+    sheets = list(tmp_path.glob("glyphs_*.svg"))
+    assert len(sheets) == 1
+    assert len(list(tmp_path.glob("img_*.png"))) == 1
+    out = (tmp_path / "a.svg").read_text(encoding="utf-8")
+    assert f'xlink:href="{sheets[0].name}#g_' in out
+    assert "data:image" not in out
+
+
+def test_images_only_keeps_glyphs_inline(tmp_path):
+    svg = _text_and_image_svg()
+    with export_engine.SvgAssetStore(tmp_path, glyphs=False) as assets:
+        assets.add(tmp_path / "single.svg", svg)
+    assert not list(tmp_path.glob("glyphs_*.svg"))
+    assert len(list(tmp_path.glob("img_*.png"))) == 1
+    out = (tmp_path / "single.svg").read_text(encoding="utf-8")
+    assert '<path id="font_' in out
+    assert "data:image" not in out